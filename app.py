@@ -1,58 +1,213 @@
-import csv
-from collections import defaultdict
-from typing import List, Union
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
 
-from src.classes import Category, Europallet
-from src.warehouse_fifo import Warehouse_FIFO
-from src.warehouse_fill_ends import Warehouse_Fill_Ends
-from src.warehouse_fill_middle import Warehouse_Fill_Middle
-from src.warehouse_greedy import Warehouse_Greedy
-from src.warehouse_lifo import Warehouse_LIFO
+from src.forklifts import fleet_report
+from src.incremental import resume_run, save_run
+from src.instrumentation import instrument
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout, load_layout
+from src.lockstep import LockstepEngine, supports
+from src.log_cache import CACHE_DIR, file_digest
+from src.operations import INPUT_LOG, OUTPUT_LOG, OperationLog, load_operations
+from src.result_cache import ResultCache, cacheable, result_key
+from src.result_sink import ResultSink
+from src.simulation import simulate_warehouse
+from src.snapshot import fork_warehouse, read_snapshot, restore_snapshot, take_snapshot, write_snapshot
+from src.strategy import BUILTIN_STRATEGIES, WarehouseStrategy, available_strategies, get_strategy
+
+Warehouse = WarehouseStrategy
+
+
+def operation_times(warehouse: Warehouse) -> dict:
+    return {
+        "input": warehouse.input_operation_time,
+        "output": warehouse.output_operation_time,
+        "total": warehouse.input_operation_time + warehouse.output_operation_time,
+    }
 
 
 class Simulator:
     def __init__(
-        self, warehouses: List[Union[Warehouse_FIFO, Warehouse_Fill_Ends, Warehouse_Fill_Middle, Warehouse_Greedy, Warehouse_LIFO]]
+        self,
+        warehouses: List[Warehouse],
+        layout: WarehouseLayout = DEFAULT_LAYOUT,
+        workers: int = 1,
+        input_log: str = INPUT_LOG,
+        output_log: str = OUTPUT_LOG,
+        streaming: bool = False,
+        cache_dir: Optional[str] = CACHE_DIR,
+        optimize_batches: bool = False,
+        seed: bool = True,
+        sink: Optional[ResultSink] = None,
+        result_cache: Optional[ResultCache] = None,
     ):
+        for warehouse in warehouses:
+            if warehouse.layout != layout:
+                raise ValueError(f"{warehouse.__class__.__name__} was built for a different layout than the simulator")
+
         self.warehouses = warehouses
-        self.operations_by_date = self._load_operations()
+        self.layout = layout
+        self.workers = workers
+        self.optimize_batches = optimize_batches
+        self.seed = seed
+        self.log_paths = {"input": input_log, "output": output_log}
+        # Sizes of the logs before they are read, the state saved by run_incremental covers at most these bytes
+        self.log_sizes = {input_output: os.path.getsize(path) for input_output, path in self.log_paths.items()}
+        # With a sink, per-day and per-operation metrics are streamed to it during run_simulation
+        self.sink = sink
+        if sink is not None:
+            for warehouse in warehouses:
+                warehouse.result_writer = sink.writer(warehouse.__class__.__name__)
+        # With a result cache, run_simulation over the whole logs reuses the results of identical earlier runs
+        self.result_cache = result_cache
+        # In streaming mode the logs are read day by day during each run instead of being loaded upfront
+        if streaming:
+            self.operations_by_date = OperationLog(input_log, output_log, seed)
+        else:
+            self.operations_by_date = load_operations(input_log, output_log, cache_dir, seed)
         self.results = {}
 
-    def _load_operations(self):
-        operations = defaultdict(lambda: {"input": [], "output": []})
-        # Add pre-existing pallets to satisfy output orders
-        operations["31/8/2023"]["input"] = [Europallet(Category.A)] * 20 + [Europallet(Category.B)] * 20 + [Europallet(Category.C)] * 20
+    def _simulate_all(self, warehouses: List[Warehouse], operations: List[dict], workers: Optional[int]) -> List[Warehouse]:
+        # Runs each warehouse over its operations, in worker processes when more than one worker is requested.
+        # Results come back in submission order, so the outcome does not depend on scheduling.
+        workers = self.workers if workers is None else workers
+        optimize_batches = [self.optimize_batches] * len(warehouses)
+        if workers == 1 or len(warehouses) <= 1:
+            return list(map(simulate_warehouse, warehouses, operations, optimize_batches))
 
-        # Import data from csv files
-        for input_output in ["input", "output"]:
-            with open(f"static/warehouse_log_{input_output}s.csv") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    date = row["Date"]
-                    pallet = Europallet(Category(row["Category"]))
-                    operations[date][input_output].append(pallet)
+        # Runs are sent in chunks, many short scenario runs would otherwise be dominated by inter-process overhead
+        workers = min(workers, len(warehouses))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(len(warehouses) // (4 * workers), 1)
+            return list(executor.map(simulate_warehouse, warehouses, operations, optimize_batches, chunksize=chunksize))
 
-        return dict(operations)
+    def run_simulation(
+        self, workers: Optional[int] = None, first_day: Union[str, int, None] = None, last_day: Union[str, int, None] = None
+    ):
+        # Run the same simulation for all warehouse placement strategies, optionally over a range of days only
+        operations_by_date = self.operations_by_date
+        if first_day is not None or last_day is not None:
+            operations_by_date = operations_by_date.days_between(first_day, last_day)
 
-    def run_simulation(self):
-        # Run the same simulation for all warehouse placement strategies
-        for warehouse in self.warehouses:
-            for date, operations in self.operations_by_date.items():
-                for input_output in ["input", "output"]:
-                    for pallet in operations[input_output]:
-                        if input_output == "input":
-                            success = warehouse.place_pallet(pallet)
-                        else:
-                            success = warehouse.retrieve_pallet(pallet)
-                        if not success:
-                            print(f"Failed to {input_output} pallet")
-
-            # Save the total operation time for each warehouse
-            self.results[warehouse.__class__.__name__] = {
-                "input": warehouse.input_operation_time,
-                "output": warehouse.output_operation_time,
-                "total": warehouse.input_operation_time + warehouse.output_operation_time,
+        # Strategies found in the result cache are not simulated again and keep their initial state
+        keys, cached = {}, {}
+        if self.result_cache is not None and first_day is None and last_day is None:
+            log_digests = {
+                input_output: file_digest(path, self.log_sizes[input_output]).hex() for input_output, path in self.log_paths.items()
             }
+            for index, warehouse in enumerate(self.warehouses):
+                if cacheable(warehouse):
+                    keys[index] = result_key(warehouse, log_digests, self.optimize_batches, self.seed)
+                    result = self.result_cache.get(keys[index])
+                    if result is not None:
+                        cached[index] = result
+
+        pending = [index for index in range(len(self.warehouses)) if index not in cached]
+        simulated = self._simulate_all([self.warehouses[index] for index in pending], [operations_by_date] * len(pending), workers)
+        for index, warehouse in zip(pending, simulated):
+            self.warehouses[index] = warehouse
+
+        # Save the total operation time and the mean days pallets stayed for each warehouse
+        for index, warehouse in enumerate(self.warehouses):
+            if index in cached:
+                self.results[warehouse.__class__.__name__] = cached[index]
+                continue
+            self.results[warehouse.__class__.__name__] = operation_times(warehouse)
+            self.results[warehouse.__class__.__name__]["mean_dwell_days"] = warehouse.dwell_times.mean
+            if index in keys:
+                self.result_cache.put(keys[index], self.results[warehouse.__class__.__name__])
+
+    def run_incremental(self, directory: str, workers: Optional[int] = None) -> Optional[int]:
+        # Like run_simulation, but resumes from the end state saved in directory by the previous call when the logs
+        # only gained new days since (see src/incremental.py), then saves the new end state there.
+        # Returns the day the previous state ended on, None when everything was replayed.
+        if self.result_cache is not None:
+            raise ValueError("run_incremental needs the end state of every strategy, which the result cache does not keep")
+        resumed_day = resume_run(self, directory)
+        self.run_simulation(workers, first_day=None if resumed_day is None else resumed_day + 1)
+        save_run(self, directory, self.log_sizes)
+        return resumed_day
+
+    def run_scenarios(
+        self, scenarios: Dict[str, dict], workers: Optional[int] = None, lockstep: bool = False
+    ) -> Dict[str, Dict[str, dict]]:
+        # Runs every strategy over every scenario (operations_by_date-like dicts), each run starting from a
+        # copy-on-write fork of the current warehouse, and returns the operation times as results[scenario][strategy].
+        # With lockstep, all the runs are stepped together in this process by src/lockstep.py instead.
+        runs = [(name, warehouse) for name in scenarios for warehouse in self.warehouses]
+        if lockstep:
+            engine = LockstepEngine([warehouse for _, warehouse in runs])
+            engine.run([scenarios[name] for name, _ in runs])
+            for input_output, failures in engine.failures.items():
+                for _ in range(sum(failures)):
+                    print(f"Failed to {input_output} pallet", file=sys.stderr)
+            results = {name: {} for name in scenarios}
+            for (name, warehouse), times in zip(runs, engine.results()):
+                results[name][warehouse.__class__.__name__] = times
+            return results
+
+        warehouses = self._simulate_all(
+            [fork_warehouse(warehouse) for _, warehouse in runs],
+            [scenarios[name] for name, _ in runs],
+            workers,
+        )
+
+        results = {name: {} for name in scenarios}
+        for (name, _), warehouse in zip(runs, warehouses):
+            results[name][warehouse.__class__.__name__] = operation_times(warehouse)
+        return results
+
+    def save_checkpoint(self, directory: str, day: Optional[int] = None):
+        # One snapshot per strategy, named after its class; day is the last simulated date ordinal
+        os.makedirs(directory, exist_ok=True)
+        for warehouse in self.warehouses:
+            write_snapshot(take_snapshot(warehouse, day), os.path.join(directory, f"{warehouse.__class__.__name__}.snapshot"))
+
+    def restore_checkpoint(self, directory: str) -> Optional[int]:
+        # Restores every strategy from save_checkpoint files and returns the day they were taken after,
+        # so the simulation can resume with run_simulation(first_day=day + 1)
+        # Every snapshot is read and checked before any warehouse changes, so a failure leaves them all untouched
+        snapshots = [
+            read_snapshot(os.path.join(directory, f"{warehouse.__class__.__name__}.snapshot")) for warehouse in self.warehouses
+        ]
+        days = {snapshot.day for snapshot in snapshots}
+        if len(days) > 1:
+            raise ValueError(f"Snapshots in {directory} were taken on different days")
+        for warehouse, snapshot in zip(self.warehouses, snapshots):
+            if warehouse.layout != snapshot.layout:
+                raise ValueError(f"{warehouse.__class__.__name__} was built for a different layout than its snapshot in {directory}")
+        for warehouse, snapshot in zip(self.warehouses, snapshots):
+            restore_snapshot(warehouse, snapshot)
+            self.results[warehouse.__class__.__name__] = operation_times(warehouse)
+        return days.pop() if days else None
+
+    def add_fleet_reports(self, forklifts: int, congestion: bool = True):
+        # Adds makespan, utilization and congestion wait with several forklifts to the results of instrumented warehouses
+        for warehouse in self.warehouses:
+            fleet = fleet_report(warehouse, forklifts, congestion)
+            self.results[warehouse.__class__.__name__].update(
+                {
+                    "forklifts": forklifts,
+                    "makespan": fleet.makespan,
+                    "utilization": fleet.utilization,
+                    "congestion_wait": fleet.congestion_wait,
+                }
+            )
+            if self.sink is not None:
+                self.sink.add_fleet_report(warehouse.__class__.__name__, fleet)
+
+    def print_fleet_report(self, forklifts: int):
+        print(f"\nMakespan with {forklifts} forklifts per placement strategy (sorted from quickest to slowest):\n")
+        for warehouse_name, results in sorted(self.results.items(), key=lambda x: x[1]["makespan"]):
+            print(
+                f"{warehouse_name}:"
+                f" \tMakespan: {results['makespan']:.2f} seconds"
+                f" \tUtilization: {results['utilization']:.1%}"
+                f" \tCongestion wait: {results['congestion_wait']:.2f} seconds"
+            )
 
     def print_report(self):
         print("\nTotal operation times per placement strategy (sorted from quickest to slowest):\n")
@@ -65,22 +220,132 @@ class Simulator:
             )
 
 
-def main():
-    # Initialize warehouses
-    warehouse_lifo = Warehouse_LIFO()
-    warehouse_fifo = Warehouse_FIFO()
-    warehouse_greedy = Warehouse_Greedy()
-    warehouse_fill_ends = Warehouse_Fill_Ends()
-    warehouse_lifo_middle = Warehouse_Fill_Middle()
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate the warehouse logs with several placement strategies")
+    parser.add_argument("--input-log", default=INPUT_LOG, help="CSV log of the pallets put in the warehouse")
+    parser.add_argument("--output-log", default=OUTPUT_LOG, help="CSV log of the pallets taken out of the warehouse")
+    parser.add_argument("--layout", help="JSON file with WarehouseLayout fields, e.g. {\"racks\": 4, \"bays_per_rack\": 50}")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        default=list(BUILTIN_STRATEGIES),
+        help=f"strategies to compare, among {', '.join(available_strategies())}",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="worker processes running strategies (and scenarios) in parallel")
+    parser.add_argument("--scenarios", type=int, default=0, help="simulate this many Monte-Carlo months sampled from the logs instead")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the Monte-Carlo months")
+    parser.add_argument("--lockstep", action="store_true", help="step all the Monte-Carlo runs together in one process")
+    parser.add_argument("--optimize-batches", action="store_true", help="assign the slots of each day of inputs together")
+    parser.add_argument("--streaming", action="store_true", help="read the logs day by day instead of loading them upfront")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the CSV logs instead of using their binary cache")
+    parser.add_argument("--result-cache", action="store_true", help="reuse the results of identical strategy, layout and log runs")
+    parser.add_argument(
+        "--state-dir", help="keep the end state here and only simulate the days appended to the logs since the last run"
+    )
+    parser.add_argument(
+        "--forklifts", type=int, default=0, help="also schedule the operations on this many forklifts sharing the aisle"
+    )
+    parser.add_argument(
+        "--format", choices=["text", "json", "npz"], default="text", help="report format (npz writes per-operation columns)"
+    )
+    parser.add_argument("--output", help="file to write the json/npz report to, json is printed when omitted")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.format == "npz" and (args.output is None or args.scenarios):
+        parser.error("--format npz needs --output and cannot be combined with --scenarios")
+    if args.forklifts < 0 or (args.forklifts and args.scenarios):
+        parser.error("--forklifts must be positive and cannot be combined with --scenarios")
+    for name in args.strategies:
+        if name not in available_strategies():
+            parser.error(f"Unknown strategy {name!r}, available: {', '.join(available_strategies())}")
+    if args.layout is not None:
+        try:
+            args.layout = load_layout(args.layout)
+        except (OSError, ValueError, TypeError) as error:
+            parser.error(f"invalid layout: {error}")
+    else:
+        args.layout = DEFAULT_LAYOUT
+    if args.state_dir is not None and (args.scenarios or args.forklifts or args.format == "npz"):
+        parser.error("--state-dir cannot be combined with --scenarios, --forklifts or --format npz")
+    if args.result_cache and args.state_dir is not None:
+        parser.error("--result-cache cannot be combined with --state-dir")
+    if args.lockstep:
+        if not args.scenarios or args.optimize_batches:
+            parser.error("--lockstep needs --scenarios and cannot be combined with --optimize-batches")
+        for name in args.strategies:
+            reason = supports(get_strategy(name)(args.layout))
+            if reason is not None:
+                parser.error(f"--lockstep: {reason}")
+    return args
+
+
+def run(args: argparse.Namespace, sink: Optional[ResultSink] = None) -> dict:
+    layout = args.layout
+
+    # Initialize warehouses; strategy modules are only imported when selected
+    warehouses = [get_strategy(name)(layout) for name in args.strategies]
+    if args.forklifts:
+        for warehouse in warehouses:
+            instrument(warehouse)
 
     # Initialize simulator
-    simulator = Simulator(warehouses=[warehouse_lifo, warehouse_fifo, warehouse_greedy, warehouse_fill_ends, warehouse_lifo_middle])
+    simulator = Simulator(
+        warehouses=warehouses,
+        layout=layout,
+        workers=args.workers,
+        input_log=args.input_log,
+        output_log=args.output_log,
+        streaming=args.streaming,
+        cache_dir=None if args.no_cache else CACHE_DIR,
+        optimize_batches=args.optimize_batches,
+        sink=sink,
+        result_cache=ResultCache() if args.result_cache else None,
+    )
+
+    if args.scenarios:
+        from src.monte_carlo import fit_demand, print_summary, run_monte_carlo, summarize
+
+        operations = simulator.operations_by_date
+        if isinstance(operations, OperationLog):
+            operations = load_operations(args.input_log, args.output_log, None)
+        model = fit_demand(operations, layout)
+        report = summarize(run_monte_carlo(simulator, model, args.scenarios, args.seed, lockstep=args.lockstep))
+        if args.format == "text":
+            print_summary(report, args.scenarios)
+    else:
+        # Run simulation
+        if args.state_dir is None:
+            simulator.run_simulation()
+        else:
+            simulator.run_incremental(args.state_dir)
+        report = simulator.results
+        if args.format == "text":
+            # Generate and print report
+            simulator.print_report()
+        if args.forklifts:
+            simulator.add_fleet_reports(args.forklifts)
+            if args.format == "text":
+                simulator.print_fleet_report(args.forklifts)
+    return report
+
 
-    # Run simulation
-    simulator.run_simulation()
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.format == "npz":
+        # The archive is only written when the whole run succeeds
+        with ResultSink(args.output) as sink:
+            run(args, sink)
+        return
 
-    # Generate and print report
-    simulator.print_report()
+    report = run(args)
+    if args.format == "json":
+        if args.output is None:
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+# Benchmark suite for the placement strategies and the simulator.
+# Run from the repository root: python -m benchmarks.suite [--scales 1 10 100] [--fill-levels 0.1 0.5 0.9] [--json results.json]
+#
+# - throughput: place_pallet/retrieve_pallet calls per second for every strategy, layout size and fill level.
+#   Each measured placement is followed by a retrieval so the fill level stays constant during the run.
+# - simulation: wall-clock time of Simulator.run_simulation over synthetic logs for every layout size.
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from app import Simulator
+from benchmarks.synthetic_logs import write_logs
+from src.classes import Category, Europallet
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.strategy import BUILTIN_STRATEGIES, get_strategy
+
+STRATEGIES = [get_strategy(name) for name in BUILTIN_STRATEGIES]
+
+# Multipliers of (racks, bays) giving 10x, 100x and 1000x the number of pallet slots
+SCALES = {1: (1, 1), 10: (1, 10), 100: (10, 10), 1000: (10, 100)}
+
+
+def category_weights(layout: WarehouseLayout) -> Dict[Category, float]:
+    # Categories in proportion to the shelves reserved for them, so that any fill level below 100% is reachable
+    shelves = layout.shelves_per_bay
+    return {Category.A: 1 / shelves, Category.B: 1 / shelves, Category.C: max(shelves - 2, 0) / shelves}
+
+
+def measure_throughput(warehouse_class, layout: WarehouseLayout, fill_level: float, ops: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    weights = category_weights(layout)
+    categories, category_weights_list = list(weights), list(weights.values())
+
+    start = time.perf_counter()
+    warehouse = warehouse_class(layout)
+    setup_time = time.perf_counter() - start
+
+    for category in rng.choices(categories, category_weights_list, k=int(layout.total_slots * fill_level)):
+        warehouse.place_pallet(Europallet(category))
+
+    place_time = retrieve_time = 0.0
+    for category in rng.choices(categories, category_weights_list, k=ops):
+        pallet = Europallet(category)
+
+        start = time.perf_counter()
+        warehouse.place_pallet(pallet)
+        middle = time.perf_counter()
+        warehouse.retrieve_pallet(pallet)
+        end = time.perf_counter()
+
+        place_time += middle - start
+        retrieve_time += end - middle
+
+    return {
+        "strategy": warehouse_class.__name__,
+        "slots": layout.total_slots,
+        "fill_level": fill_level,
+        "setup_seconds": setup_time,
+        "place_ops_per_second": ops / place_time,
+        "retrieve_ops_per_second": ops / retrieve_time,
+    }
+
+
+def measure_simulation(layout: WarehouseLayout, days: int, pallets_per_day: int, seed: int = 0) -> List[dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        input_log, output_log = os.path.join(directory, "inputs.csv"), os.path.join(directory, "outputs.csv")
+        write_logs(input_log, output_log, days, pallets_per_day, layout, seed)
+
+        records = []
+        for warehouse_class in STRATEGIES:
+            simulator = Simulator([warehouse_class(layout)], layout, input_log=input_log, output_log=output_log, cache_dir=None)
+            start = time.perf_counter()
+            simulator.run_simulation()
+            records.append(
+                {
+                    "strategy": warehouse_class.__name__,
+                    "slots": layout.total_slots,
+                    "days": days,
+                    "pallets_per_day": pallets_per_day,
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+        return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the placement strategies and the simulator")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], choices=list(SCALES))
+    parser.add_argument("--fill-levels", type=float, nargs="+", default=[0.1, 0.5, 0.9])
+    parser.add_argument("--ops", type=int, default=5000, help="placement/retrieval pairs measured per run")
+    parser.add_argument("--days", type=int, default=30, help="days of synthetic logs for the simulation benchmark")
+    parser.add_argument("--pallets-per-day", type=int, default=10, help="daily inputs/outputs on the 1x layout, scaled with the layout")
+    parser.add_argument("--json", help="also write every measurement to this file")
+    args = parser.parse_args()
+
+    results = {"throughput": [], "simulation": []}
+
+    print(f"{'Strategy':<24}{'Slots':>9}{'Fill':>6}{'Setup (s)':>11}{'Place ops/s':>13}{'Retrieve ops/s':>16}")
+    for scale in args.scales:
+        layout = DEFAULT_LAYOUT.scaled(*SCALES[scale])
+        for fill_level in args.fill_levels:
+            for warehouse_class in STRATEGIES:
+                record = measure_throughput(warehouse_class, layout, fill_level, args.ops)
+                results["throughput"].append(record)
+                print(
+                    f"{record['strategy']:<24}{record['slots']:>9}{fill_level:>6.0%}{record['setup_seconds']:>11.3f}"
+                    f"{record['place_ops_per_second']:>13.0f}{record['retrieve_ops_per_second']:>16.0f}"
+                )
+
+    print(f"\n{'Strategy':<24}{'Slots':>9}{'Days':>6}{'Pallets/day':>13}{'Simulation (s)':>16}")
+    for scale in args.scales:
+        layout = DEFAULT_LAYOUT.scaled(*SCALES[scale])
+        for record in measure_simulation(layout, args.days, args.pallets_per_day * scale):
+            results["simulation"].append(record)
+            print(
+                f"{record['strategy']:<24}{record['slots']:>9}{record['days']:>6}"
+                f"{record['pallets_per_day']:>13}{record['seconds']:>16.3f}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
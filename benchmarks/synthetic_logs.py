@@ -0,0 +1,72 @@
+# Synthetic input/output logs in the format of static/warehouse_log_*.csv, sized for any layout.
+# Run from the repository root: python -m benchmarks.synthetic_logs INPUT_CSV OUTPUT_CSV [--days 365] [--pallets-per-day 20]
+import argparse
+import csv
+import random
+from typing import Dict, Iterator, Tuple
+
+from src.classes import Category
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.operations import SEED_DATE, date_ordinal, format_date, seed_pallets
+
+CATEGORY_WEIGHTS = {Category.A: 0.3, Category.B: 0.3, Category.C: 0.4}
+
+
+def generate_operations(
+    days: int, pallets_per_day: int, layout: WarehouseLayout = DEFAULT_LAYOUT, fill_level: float = 0.4, seed: int = 0
+) -> Iterator[Tuple[str, str, Category]]:
+    # Yields (date, "Input"/"Output", category) rows, day by day from the day after SEED_DATE.
+    # Stock is tracked so that outputs never ask for a missing category and the warehouse stays below fill_level.
+    rng = random.Random(seed)
+    categories = list(CATEGORY_WEIGHTS)
+    weights = list(CATEGORY_WEIGHTS.values())
+    stock: Dict[Category, int] = {category: 0 for category in categories}
+    for pallet in seed_pallets():
+        stock[pallet.category] += 1
+    max_stock = int(layout.total_slots * fill_level)
+
+    first_day = date_ordinal(SEED_DATE) + 1
+    for day in range(days):
+        date = format_date(first_day + day)
+        inputs = rng.randint(pallets_per_day // 2, pallets_per_day * 3 // 2)
+        outputs = rng.randint(pallets_per_day // 2, pallets_per_day * 3 // 2)
+
+        for _ in range(min(inputs, max_stock - sum(stock.values()))):
+            category = rng.choices(categories, weights)[0]
+            stock[category] += 1
+            yield date, "Input", category
+
+        for _ in range(outputs):
+            available = [category for category in categories if stock[category]]
+            if not available:
+                break
+            category = rng.choices(available, [CATEGORY_WEIGHTS[category] for category in available])[0]
+            stock[category] -= 1
+            yield date, "Output", category
+
+
+def write_logs(
+    input_path: str, output_path: str, days: int, pallets_per_day: int, layout: WarehouseLayout = DEFAULT_LAYOUT, seed: int = 0
+):
+    with open(input_path, "w", newline="") as input_file, open(output_path, "w", newline="") as output_file:
+        writers = {"Input": csv.writer(input_file), "Output": csv.writer(output_file)}
+        for writer in writers.values():
+            writer.writerow(["Date", "Transaction_Type", "Category"])
+        for date, transaction_type, category in generate_operations(days, pallets_per_day, layout, seed=seed):
+            writers[transaction_type].writerow([date, transaction_type, category.value])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic warehouse input/output logs")
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--pallets-per-day", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_logs(args.input_path, args.output_path, args.days, args.pallets_per_day, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
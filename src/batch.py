@@ -0,0 +1,248 @@
+import heapq
+import time
+from collections import Counter, deque
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Tuple
+
+from src.classes import CATEGORY_CODES, EMPTY_SLOT, UNKNOWN_DAY, Category, Europallet, can_accept_category
+from src.instrumentation import INPUT, OUTPUT
+
+# Batch versions of place_pallet/retrieve_pallet working on a whole day of pallets at once. They rely on the
+# members every strategy shares (state, cost_model, free_slots, occupied_slots and free_slot_key) and bind
+# them once per batch instead of once per pallet. Placements also store each pallet's ID and arrival day in the
+# state, and retrievals record how long the pallet stayed in dwell_times when both days are known.
+
+Slot = Tuple[int, int, int, int]
+
+
+def place_batch(warehouse, pallets: List[Europallet], optimize: bool = False) -> List[bool]:
+    # Without optimize, every pallet gets exactly the slot place_pallet would have given it, in order.
+    # With optimize, the slots of the whole batch are chosen together (see _assign_free_slots).
+    recorder = getattr(warehouse, "recorder", None)
+    if optimize:
+        return _place_optimized(warehouse, pallets, recorder)
+    if recorder is not None:
+        return _place_recorded(warehouse, pallets, recorder)
+
+    find = warehouse.free_slots.find
+    update_free = warehouse.free_slots.update
+    add_occupied = warehouse.occupied_slots.add
+    slots = warehouse.state.slots
+    pallet_ids = warehouse.state.pallet_ids
+    arrival_days = warehouse.state.arrival_days
+    shelf_offset = warehouse.state.shelf_offset
+    input_times = warehouse.cost_model.input_times
+
+    results = []
+    input_operation_time = warehouse.input_operation_time
+    for pallet in pallets:
+        position = find(pallet.category)
+        if position is None:
+            results.append(False)
+            continue
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        index = shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+        slots[index] = CATEGORY_CODES[pallet.category]
+        pallet_ids[index] = pallet.pallet_id
+        arrival_days[index] = pallet.arrival
+        update_free(rack_num, bay_num, shelf_num)
+        add_occupied(rack_num, bay_num, shelf_num, pallet_pos)
+        input_operation_time += input_times[rack_num][bay_num][shelf_num][pallet_pos]
+        results.append(True)
+
+    warehouse.input_operation_time = input_operation_time
+    return results
+
+
+def retrieve_batch(warehouse, pallet_requests: List[Europallet]) -> List[bool]:
+    # Categories never compete for stored pallets, so serving requests one by one is already the best
+    # assignment for the batch; this is retrieve_pallet without the per-call overhead.
+    recorder = getattr(warehouse, "recorder", None)
+    if recorder is not None:
+        return _retrieve_recorded(warehouse, pallet_requests, recorder)
+
+    find = warehouse.occupied_slots.find
+    update_free = warehouse.free_slots.update
+    slots = warehouse.state.slots
+    arrival_days = warehouse.state.arrival_days
+    shelf_offset = warehouse.state.shelf_offset
+    output_times = warehouse.cost_model.output_times
+    record_dwell = warehouse.dwell_times.record
+
+    results = []
+    output_operation_time = warehouse.output_operation_time
+    for pallet_request in pallet_requests:
+        position = find(pallet_request.category)
+        if position is None:
+            results.append(False)
+            continue
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        index = shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+        slots[index] = EMPTY_SLOT
+        arrival = arrival_days[index]
+        if arrival != UNKNOWN_DAY and pallet_request.arrival != UNKNOWN_DAY:
+            record_dwell(CATEGORY_CODES[pallet_request.category], pallet_request.arrival - arrival)
+        update_free(rack_num, bay_num, shelf_num)
+        output_operation_time += output_times[rack_num][bay_num][shelf_num][pallet_pos]
+        results.append(True)
+
+    warehouse.output_operation_time = output_operation_time
+    return results
+
+
+def _place_recorded(warehouse, pallets: List[Europallet], recorder) -> List[bool]:
+    # Same placements as place_batch, one pallet at a time, timing each decision
+    free_slots = warehouse.free_slots
+    input_times = warehouse.cost_model.input_times
+
+    results = []
+    for pallet in pallets:
+        start = time.perf_counter()
+        pending = free_slots.pending(pallet.category)
+        position = free_slots.find(pallet.category)
+        seconds = time.perf_counter() - start
+        candidates = pending - free_slots.pending(pallet.category) + (position is not None)
+
+        if position is None:
+            recorder.record(INPUT, pallet.category, None, 0.0, candidates, seconds)
+            results.append(False)
+            continue
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        cost = input_times[rack_num][bay_num][shelf_num][pallet_pos]
+        _store(warehouse.state, rack_num, bay_num, shelf_num, pallet_pos, pallet)
+        free_slots.update(rack_num, bay_num, shelf_num)
+        warehouse.occupied_slots.add(rack_num, bay_num, shelf_num, pallet_pos)
+        warehouse.input_operation_time += cost
+        recorder.record(INPUT, pallet.category, position, cost, candidates, seconds)
+        results.append(True)
+    return results
+
+
+def _retrieve_recorded(warehouse, pallet_requests: List[Europallet], recorder) -> List[bool]:
+    occupied_slots = warehouse.occupied_slots
+    output_times = warehouse.cost_model.output_times
+
+    results = []
+    for pallet_request in pallet_requests:
+        start = time.perf_counter()
+        pending = occupied_slots.pending(pallet_request.category)
+        position = occupied_slots.find(pallet_request.category)
+        seconds = time.perf_counter() - start
+        candidates = pending - occupied_slots.pending(pallet_request.category) + (position is not None)
+
+        if position is None:
+            recorder.record(OUTPUT, pallet_request.category, None, 0.0, candidates, seconds)
+            results.append(False)
+            continue
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        cost = output_times[rack_num][bay_num][shelf_num][pallet_pos]
+        index = warehouse.state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+        warehouse.state.slots[index] = EMPTY_SLOT
+        arrival = warehouse.state.arrival_days[index]
+        if arrival != UNKNOWN_DAY and pallet_request.arrival != UNKNOWN_DAY:
+            warehouse.dwell_times.record(CATEGORY_CODES[pallet_request.category], pallet_request.arrival - arrival)
+        warehouse.free_slots.update(rack_num, bay_num, shelf_num)
+        warehouse.output_operation_time += cost
+        recorder.record(OUTPUT, pallet_request.category, position, cost, candidates, seconds)
+        results.append(True)
+    return results
+
+
+def _store(state, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int, pallet: Europallet):
+    index = state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+    state.slots[index] = CATEGORY_CODES[pallet.category]
+    state.pallet_ids[index] = pallet.pallet_id
+    state.arrival_days[index] = pallet.arrival
+
+
+def _place_optimized(warehouse, pallets: List[Europallet], recorder=None) -> List[bool]:
+    start = time.perf_counter()
+    assignment, candidates = _assign_free_slots(warehouse, pallets)
+    seconds = time.perf_counter() - start
+
+    input_times = warehouse.cost_model.input_times
+    for index, (rack_num, bay_num, shelf_num, pallet_pos) in sorted(assignment.items()):
+        _store(warehouse.state, rack_num, bay_num, shelf_num, pallet_pos, pallets[index])
+        warehouse.occupied_slots.add(rack_num, bay_num, shelf_num, pallet_pos)
+        warehouse.input_operation_time += input_times[rack_num][bay_num][shelf_num][pallet_pos]
+    for rack_num, bay_num, shelf_num in {slot[:3] for slot in assignment.values()}:
+        warehouse.free_slots.update(rack_num, bay_num, shelf_num)
+
+    if recorder is not None:
+        # The decision is taken for the whole batch: its time is shared evenly and every pallet reports all candidates
+        for index, pallet in enumerate(pallets):
+            slot = assignment.get(index)
+            cost = 0.0 if slot is None else input_times[slot[0]][slot[1]][slot[2]][slot[3]]
+            recorder.record(INPUT, pallet.category, slot, cost, candidates, seconds / len(pallets))
+
+    return [index in assignment for index in range(len(pallets))]
+
+
+def _assign_free_slots(warehouse, pallets: List[Europallet]) -> Tuple[Dict[int, Slot], int]:
+    # Picks the free slots with the lowest strategy keys (free_slot_key, e.g. input time for Greedy) that can
+    # hold as many of the pallets as possible together. Which slots can be filled together only depends on
+    # how many slots of each shelf type (the set of categories it accepts) are used, so this is a transversal
+    # matroid: scanning candidates by increasing key and keeping a slot whenever Hall's condition still holds
+    # gives a minimum-cost maximum placement, instead of letting early pallets take slots later ones needed.
+    # Also returns the number of free slots that were considered.
+    layout = warehouse.layout
+    demand = Counter(pallet.category for pallet in pallets)
+    slot_types = [
+        frozenset(category for category in Category if can_accept_category(level, category, layout))
+        for level in range(layout.shelves_per_bay)
+    ]
+    types = list(dict.fromkeys(slot_types))
+
+    # Only the cheapest slots of each type can be part of the answer, as many as the pallets it could take
+    candidates_per_type: Dict[FrozenSet[Category], list] = {slot_type: [] for slot_type in types}
+    slots = warehouse.state.slots
+    for rack_num in range(layout.racks):
+        for bay_num in range(layout.bays_per_rack):
+            for shelf_num in range(layout.shelves_per_bay):
+                offset = layout.shelf_offset(rack_num, bay_num, shelf_num)
+                for pallet_pos in range(layout.pallets_per_shelf):
+                    if slots[offset + pallet_pos] == EMPTY_SLOT:
+                        key = (warehouse.free_slot_key(rack_num, bay_num, shelf_num, pallet_pos), pallet_pos)
+                        candidates_per_type[slot_types[shelf_num]].append((key, (rack_num, bay_num, shelf_num, pallet_pos)))
+
+    candidates = []
+    for slot_type, type_candidates in candidates_per_type.items():
+        limit = sum(demand[category] for category in slot_type)
+        candidates.extend((key, slot, slot_type) for key, slot in heapq.nsmallest(limit, type_candidates))
+    candidates.sort()
+
+    # Hall's condition: every group of types may not use more slots than the pallets its categories can supply
+    constraints: Dict[FrozenSet[Category], List[Tuple[Tuple[FrozenSet[Category], ...], int]]] = {slot_type: [] for slot_type in types}
+    for size in range(1, len(types) + 1):
+        for group in combinations(types, size):
+            capacity = sum(demand[category] for category in frozenset().union(*group))
+            for slot_type in group:
+                constraints[slot_type].append((group, capacity))
+
+    used = Counter()
+    chosen: Dict[FrozenSet[Category], deque] = {slot_type: deque() for slot_type in types}
+    remaining = len(pallets)
+    for key, slot, slot_type in candidates:
+        if remaining == 0:
+            break
+        if all(sum(used[member] for member in group) < capacity for group, capacity in constraints[slot_type]):
+            used[slot_type] += 1
+            chosen[slot_type].append((key, slot))
+            remaining -= 1
+
+    # Serve the most restricted categories first; with the chosen counts this always uses every chosen slot
+    assignment: Dict[int, Slot] = {}
+    for category in sorted(demand, key=lambda category: sum(category in slot_type for slot_type in types)):
+        accepting = [chosen[slot_type] for slot_type in types if category in slot_type]
+        for index, pallet in enumerate(pallets):
+            if pallet.category != category:
+                continue
+            queues = [queue for queue in accepting if queue]
+            if not queues:
+                break
+            assignment[index] = min(queues, key=lambda queue: queue[0][0]).popleft()[1]
+    return assignment, sum(len(type_candidates) for type_candidates in candidates_per_type.values())
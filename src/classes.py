@@ -1,8 +1,10 @@
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Optional
+from itertools import chain, count
+from typing import Callable, Iterator, List, Optional, Union
 
-from src.constants import BAYS_PER_RACK, PALLETS_PER_SHELF, SHELVES_PER_BAY
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
 
 
 class Category(Enum):
@@ -11,52 +13,409 @@ class Category(Enum):
     C = "Category C"  # Any shelf
 
 
-@dataclass
+# One byte per pallet slot in the warehouse state, 0 meaning the slot is free
+EMPTY_SLOT = 0
+CATEGORY_CODES = {Category.A: 1, Category.B: 2, Category.C: 3}
+CATEGORIES_BY_CODE = [None, Category.A, Category.B, Category.C]
+
+# Pallets get a process-wide sequential ID when created; the arrival day is the date ordinal of the log row
+# (for an output request, the day it is requested), or UNKNOWN_DAY for pallets of unknown origin
+NO_PALLET = -1
+UNKNOWN_DAY = -1
+_pallet_ids = count()
+
+
+def _new_pallet_id() -> int:
+    return next(_pallet_ids)
+
+
+def reserve_pallet_ids(last_id: int):
+    # New pallets get IDs above last_id, e.g. after restoring pallets that were created by another process
+    global _pallet_ids
+    _pallet_ids = count(max(next(_pallet_ids), last_id + 1))
+
+
+@dataclass(slots=True)
 class Europallet:
+    # Pallets compare by category only: an output request asks for any pallet of its category
     category: Category
+    arrival: int = field(default=UNKNOWN_DAY, compare=False)
+    pallet_id: int = field(default_factory=_new_pallet_id, compare=False)
+
+
+def can_accept_category(shelf_level: int, category: Category, layout: WarehouseLayout = DEFAULT_LAYOUT) -> bool:
+    if category == Category.A:
+        return shelf_level == 0  # Bottom shelf
+    elif category == Category.B:
+        return shelf_level == layout.top_shelf  # Top shelf
+    return True  # Category C can go anywhere
+
+
+class ViewList:
+    # Read-only sequence that creates the Bay/Shelf views on access instead of keeping them all alive
+    __slots__ = ("_length", "_factory")
+
+    def __init__(self, length: int, factory: Callable[[int], object]):
+        self._length = length
+        self._factory = factory
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        position = range(self._length)[index]
+        if isinstance(position, range):
+            return [self._factory(i) for i in position]
+        return self._factory(position)
+
+    def __iter__(self) -> Iterator:
+        return map(self._factory, range(self._length))
+
+
+def _read_only(state: Optional["WarehouseState"]):
+    # Views of a warehouse state cannot write to it: the slot indexes and operation times of the strategy owning
+    # the state would not follow. Standalone shelves, bays and racks keep their own slots and stay writable.
+    if state is not None:
+        raise TypeError("the shelves of a warehouse are read-only, use its place_pallet/retrieve_pallet instead")
+
+
+class PalletSlots:
+    # List-like view over the slots of one shelf; pallets are decoded from their category code on access,
+    # with the ID and arrival day stored in the warehouse state
+    __slots__ = ("_slots", "_start", "_stop", "_state")
+
+    def __init__(self, slots: bytearray, start: int, length: int, state: Optional["WarehouseState"] = None):
+        self._slots = slots
+        self._start = start
+        self._stop = start + length
+        self._state = state
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        position = range(self._start, self._stop)[index]
+        if isinstance(position, range):
+            return [self._decode(i) for i in position]
+        return self._decode(position)
+
+    def __setitem__(self, index, pallet):
+        _read_only(self._state)
+        position = range(self._start, self._stop)[index]
+        if isinstance(position, range):
+            pallets = list(pallet)
+            if len(pallets) != len(position):
+                raise ValueError("a shelf cannot change size")
+            for i, stored in zip(position, pallets):
+                self._slots[i] = self._encode(stored)
+            return
+        self._slots[position] = self._encode(pallet)
+
+    def __iter__(self) -> Iterator[Optional[Europallet]]:
+        return map(self._decode, range(self._start, self._stop))
+
+    def __contains__(self, pallet: Optional[Europallet]) -> bool:
+        return self._encode(pallet) in self._slots[self._start : self._stop]
+
+    def index(self, pallet: Optional[Europallet]) -> int:
+        position = self._slots.find(self._encode(pallet), self._start, self._stop)
+        if position == -1:
+            raise ValueError(f"{pallet} is not in shelf")
+        return position - self._start
+
+    @staticmethod
+    def _encode(pallet: Optional[Europallet]) -> int:
+        return EMPTY_SLOT if pallet is None else CATEGORY_CODES[pallet.category]
+
+    def _decode(self, index: int) -> Optional[Europallet]:
+        code = self._slots[index]
+        if code == EMPTY_SLOT:
+            return None
+        if self._state is None:
+            return Europallet(CATEGORIES_BY_CODE[code], UNKNOWN_DAY, NO_PALLET)
+        return Europallet(CATEGORIES_BY_CODE[code], self._state.arrival_days[index], self._state.pallet_ids[index])
 
 
-@dataclass
 class Shelf:
-    level: int
-    pallets: List[Optional[Europallet]]
+    __slots__ = ("level", "layout", "_slots", "_offset", "_state")
 
-    def __init__(self, level: int):
+    def __init__(
+        self,
+        level: int,
+        slots: Optional[bytearray] = None,
+        offset: int = 0,
+        layout: WarehouseLayout = DEFAULT_LAYOUT,
+        state: Optional["WarehouseState"] = None,
+    ):
         self.level = level
-        self.pallets = [None] * PALLETS_PER_SHELF
+        self.layout = layout
+        self._slots = bytearray(layout.pallets_per_shelf) if slots is None else slots
+        self._offset = offset
+        self._state = state
+
+    @property
+    def pallets(self) -> PalletSlots:
+        return PalletSlots(self._slots, self._offset, self.layout.pallets_per_shelf, self._state)
 
     def can_accept_category(self, category: Category) -> bool:
-        if category == Category.A:
-            return self.level == 0  # Bottom shelf
-        elif category == Category.B:
-            return self.level == SHELVES_PER_BAY - 1  # Top shelf
-        return True  # Category C can go anywhere
+        return can_accept_category(self.level, category, self.layout)
 
     def has_space(self) -> bool:
-        return None in self.pallets
+        return EMPTY_SLOT in self._slots[self._offset : self._offset + self.layout.pallets_per_shelf]
 
     def add_pallet(self, pallet: Europallet) -> bool:
-        if not self.can_accept_category(pallet.category) or not self.has_space():
+        _read_only(self._state)
+        if not self.can_accept_category(pallet.category):
+            return False
+
+        position = self._slots.find(EMPTY_SLOT, self._offset, self._offset + self.layout.pallets_per_shelf)
+        if position == -1:
             return False
 
-        for i in range(PALLETS_PER_SHELF):
-            if self.pallets[i] is None:
-                self.pallets[i] = pallet
-                return True
-        return False
+        self._slots[position] = CATEGORY_CODES[pallet.category]
+        return True
 
 
-@dataclass
 class Bay:
-    position: int
-    shelves: List[Shelf]
+    __slots__ = ("position", "layout", "_slots", "_offset", "_state")
 
-    def __init__(self, position: int):
+    def __init__(
+        self,
+        position: int,
+        slots: Optional[bytearray] = None,
+        offset: int = 0,
+        layout: WarehouseLayout = DEFAULT_LAYOUT,
+        state: Optional["WarehouseState"] = None,
+    ):
         self.position = position
-        self.shelves = [Shelf(i) for i in range(SHELVES_PER_BAY)]
+        self.layout = layout
+        self._slots = bytearray(layout.slots_per_bay) if slots is None else slots
+        self._offset = offset
+        self._state = state
+
+    @property
+    def shelves(self) -> ViewList:
+        return ViewList(self.layout.shelves_per_bay, self._shelf)
+
+    def _shelf(self, level: int) -> Shelf:
+        return Shelf(level, self._slots, self._offset + level * self.layout.pallets_per_shelf, self.layout, self._state)
 
 
 class Rack:
-    def __init__(self, rack_number: int):
+    __slots__ = ("rack_number", "layout", "_slots", "_offset", "_state")
+
+    def __init__(
+        self,
+        rack_number: int,
+        slots: Optional[bytearray] = None,
+        offset: int = 0,
+        layout: WarehouseLayout = DEFAULT_LAYOUT,
+        state: Optional["WarehouseState"] = None,
+    ):
         self.rack_number = rack_number
-        self.bays = [Bay(i) for i in range(BAYS_PER_RACK)]
+        self.layout = layout
+        self._slots = bytearray(layout.slots_per_rack) if slots is None else slots
+        self._offset = offset
+        self._state = state
+
+    @property
+    def bays(self) -> ViewList:
+        return ViewList(self.layout.bays_per_rack, self._bay)
+
+    def _bay(self, position: int) -> Bay:
+        return Bay(position, self._slots, self._offset + position * self.layout.slots_per_bay, self.layout, self._state)
+
+
+class PagedSlots:
+    # bytearray-like slot storage split in pages that forked states share until one of them writes to a page.
+    # Pages hold whole shelves, so a find() within a shelf never has to cross a page boundary.
+    # Built from an array instead, the pages are arrays of the same type (pallet IDs and arrival days).
+    __slots__ = ("_pages", "_owned", "_page_size", "_length", "_empty")
+
+    def __init__(self, data: Union[bytes, bytearray, array], page_size: int):
+        if not isinstance(data, (bytearray, array)):
+            data = bytearray(data)
+        self._page_size = page_size
+        self._length = len(data)
+        self._empty = data[:0]
+        self._pages = [data[start : start + page_size] for start in range(0, len(data), page_size)]
+        self._owned = [True] * len(self._pages)
+
+    def fork(self) -> "PagedSlots":
+        # Both sides give up ownership of every page, the first write to a page then copies it
+        child = PagedSlots.__new__(PagedSlots)
+        child._page_size = self._page_size
+        child._length = self._length
+        child._empty = self._empty
+        child._pages = list(self._pages)
+        self._owned = [False] * len(self._pages)
+        child._owned = [False] * len(self._pages)
+        return child
+
+    @property
+    def shared_pages(self) -> int:
+        return self._owned.count(False)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bytes__(self) -> bytes:
+        return b"".join(self._pages)
+
+    def _data(self) -> Union[bytearray, array]:
+        # Copy of the whole storage as one bytearray or array
+        data = self._empty[:]
+        for page in self._pages:
+            data += page
+        return data
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self._pages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            page, offset = divmod(start, self._page_size)
+            if step == 1 and start < stop and stop - start <= self._page_size - offset:
+                return self._pages[page][offset : offset + stop - start]
+            return self._data()[index]
+        if index < 0:
+            index += self._length
+        page, offset = divmod(index, self._page_size)
+        return self._pages[page][offset]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            data = self._data()
+            data[index] = value
+            if len(data) != self._length:
+                raise ValueError("PagedSlots cannot change size")
+            self.__init__(data, self._page_size)
+            return
+        if index < 0:
+            index += self._length
+        page, offset = divmod(index, self._page_size)
+        if not self._owned[page]:
+            self._pages[page] = self._pages[page][:]
+            self._owned[page] = True
+        self._pages[page][offset] = value
+
+    def count(self, value: int) -> int:
+        return sum(page.count(value) for page in self._pages)
+
+    def find(self, value: int, start: int = 0, end: Optional[int] = None) -> int:
+        end = self._length if end is None else min(end, self._length)
+        while start < end:
+            page, offset = divmod(start, self._page_size)
+            page_end = min(end - page * self._page_size, self._page_size)
+            position = self._pages[page].find(value, offset, page_end)
+            if position != -1:
+                return page * self._page_size + position
+            start = (page + 1) * self._page_size
+        return -1
+
+
+class WarehouseState:
+    # Occupancy of the whole warehouse as one category code per pallet slot, laid out as
+    # (rack, bay, shelf, pallet position); Rack/Bay/Shelf objects are read-only views over it.
+    # pallet_ids and arrival_days hold the stored pallet's ID and arrival day in the same order; they are
+    # left as they are when a pallet is removed, so they only mean something for occupied slots.
+    def __init__(self, layout: WarehouseLayout = DEFAULT_LAYOUT):
+        self.layout = layout
+        self.shelf_offset = layout.shelf_offset
+        self.slots = bytearray(layout.total_slots)
+        self.pallet_ids = array("q", [NO_PALLET]) * layout.total_slots
+        self.arrival_days = array("i", [UNKNOWN_DAY]) * layout.total_slots
+        self.racks: List[Rack] = [Rack(i, self.slots, i * layout.slots_per_rack, layout, self) for i in range(layout.racks)]
+
+    def fork(self, page_size: Optional[int] = None) -> "WarehouseState":
+        # Copy-on-write copy of the state: both states switch to PagedSlots sharing every page, and each
+        # copies a page the first time it writes to it. The default page holds as many whole bays as fit in 4 KiB.
+        # Pallet IDs and arrival days are paged the same way, so a branch only pays for the slots it changes.
+        if not isinstance(self.slots, PagedSlots):
+            page_size = page_size or self.layout.slots_per_bay * max(4096 // self.layout.slots_per_bay, 1)
+            self._use_slots(PagedSlots(self.slots, page_size))
+            self.pallet_ids = PagedSlots(self.pallet_ids, page_size)
+            self.arrival_days = PagedSlots(self.arrival_days, page_size)
+
+        child = WarehouseState.__new__(WarehouseState)
+        child.layout = self.layout
+        child.shelf_offset = self.shelf_offset
+        child.pallet_ids = self.pallet_ids.fork()
+        child.arrival_days = self.arrival_days.fork()
+        child.racks = []
+        child._use_slots(self.slots.fork())
+        return child
+
+    def _use_slots(self, slots: Union[bytearray, PagedSlots]):
+        # Existing Rack views are kept, so references to self.racks stay valid
+        self.slots = slots
+        if not self.racks:
+            self.racks.extend(Rack(i, slots, i * self.layout.slots_per_rack, self.layout, self) for i in range(self.layout.racks))
+        for rack in self.racks:
+            rack._slots = slots
+
+    def first_free_position(self, rack_num: int, bay_num: int, shelf_num: int) -> int:
+        # Returns -1 when the shelf is full
+        offset = self.shelf_offset(rack_num, bay_num, shelf_num)
+        position = self.slots.find(EMPTY_SLOT, offset, offset + self.layout.pallets_per_shelf)
+        return position if position == -1 else position - offset
+
+    def category_at(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int) -> Optional[Category]:
+        return CATEGORIES_BY_CODE[self.slots[self.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos]]
+
+    def add_pallet(self, rack_num: int, bay_num: int, shelf_num: int, pallet: Europallet) -> bool:
+        # Stores the pallet in the first free slot of the shelf, following the Shelf.add_pallet rules
+        if not can_accept_category(shelf_num, pallet.category, self.layout):
+            return False
+
+        pallet_pos = self.first_free_position(rack_num, bay_num, shelf_num)
+        if pallet_pos == -1:
+            return False
+
+        index = self.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+        self.slots[index] = CATEGORY_CODES[pallet.category]
+        self.pallet_ids[index] = pallet.pallet_id
+        self.arrival_days[index] = pallet.arrival
+        return True
+
+    def remove_pallet(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int):
+        self.slots[self.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos] = EMPTY_SLOT
+
+
+class DwellTimes:
+    # Days each retrieved pallet spent in the warehouse, per category, for pallets whose arrival day and
+    # retrieval day are both known
+    __slots__ = ("counts", "totals", "longest")
+
+    def __init__(self):
+        self.counts = [0] * len(CATEGORIES_BY_CODE)
+        self.totals = [0] * len(CATEGORIES_BY_CODE)
+        self.longest = [0] * len(CATEGORIES_BY_CODE)
+
+    def record(self, code: int, days: int):
+        self.counts[code] += 1
+        self.totals[code] += days
+        if days > self.longest[code]:
+            self.longest[code] = days
+
+    def copy(self) -> "DwellTimes":
+        other = DwellTimes()
+        other.counts, other.totals, other.longest = list(self.counts), list(self.totals), list(self.longest)
+        return other
+
+    @property
+    def mean(self) -> float:
+        retrieved = sum(self.counts)
+        return sum(self.totals) / retrieved if retrieved else 0.0
+
+    def summary(self) -> dict:
+        return {
+            category.name: {
+                "pallets": self.counts[code],
+                "mean_days": self.totals[code] / self.counts[code],
+                "max_days": self.longest[code],
+            }
+            for category, code in CATEGORY_CODES.items()
+            if self.counts[code]
+        }
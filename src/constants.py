@@ -7,3 +7,5 @@ PALLET_WIDTH = 0.8  # meters (b_pallet = 0.8m)
 PALLETS_PER_SHELF = 3
 BAYS_PER_RACK = 10
 SHELVES_PER_BAY = 4
+RACKS_PER_AISLE = 2  # one rack on each side of an aisle
+AISLE_SPACING = 5.4  # meters between neighbouring aisles (an aisle and two back-to-back racks)
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+
+
+def operation_legs(
+    bay_position: int,
+    shelf_level: int,
+    pallet_position: int,
+    is_output: bool,
+    layout: WarehouseLayout = DEFAULT_LAYOUT,
+    rack_number: int = 0,
+) -> Tuple[float, float]:
+    # One-way distance from the operation's area to the pallet, and the time spent lifting to the shelf and back down.
+    # Racks past the first aisle are reached along the cross aisle at the area's end.
+    if is_output:
+        bay_distance = (layout.bays_per_rack - bay_position - 1) * layout.rack_width
+        rack_distance = (layout.pallets_per_shelf - pallet_position - 1) * layout.pallet_width
+    else:
+        bay_distance = bay_position * layout.rack_width
+        rack_distance = pallet_position * layout.pallet_width
+
+    aisle_distance = layout.aisle_of(rack_number) * layout.aisle_spacing
+    one_way_distance = layout.distance_to_areas + aisle_distance + bay_distance + rack_distance + (layout.pallet_width / 2)
+    vertical_time = (shelf_level * layout.shelf_height * 2) / layout.lift_speed
+    return one_way_distance, vertical_time
+
+
+def calculate_operation_time(
+    bay_position: int,
+    shelf_level: int,
+    pallet_position: int,
+    is_output: bool,
+    layout: WarehouseLayout = DEFAULT_LAYOUT,
+    rack_number: int = 0,
+) -> float:
+    one_way_distance, vertical_time = operation_legs(bay_position, shelf_level, pallet_position, is_output, layout, rack_number)
+    horizontal_time = 2 * one_way_distance / layout.forklift_speed
+
+    return horizontal_time + vertical_time
+
+
+class CostModel:
+    # Input and output times of every pallet slot, precomputed once per layout and indexed
+    # as times[rack][bay][shelf][pallet_position]
+    def __init__(self, layout: WarehouseLayout = DEFAULT_LAYOUT):
+        self.layout = layout
+        self.input_times = self._build_times(False)
+        self.output_times = self._build_times(True)
+
+    def _build_times(self, is_output: bool) -> List[List[List[List[float]]]]:
+        layout = self.layout
+        times_per_aisle = [
+            [
+                [
+                    [
+                        calculate_operation_time(bay_num, shelf_num, pallet_pos, is_output, layout, aisle * layout.racks_per_aisle)
+                        for pallet_pos in range(layout.pallets_per_shelf)
+                    ]
+                    for shelf_num in range(layout.shelves_per_bay)
+                ]
+                for bay_num in range(layout.bays_per_rack)
+            ]
+            for aisle in range(layout.aisles)
+        ]
+        # Both sides of an aisle are equally far from the areas, so the racks of an aisle share the same table
+        return [times_per_aisle[layout.aisle_of(rack_num)] for rack_num in range(layout.racks)]
+
+
+@lru_cache(maxsize=None)
+def get_cost_model(layout: WarehouseLayout = DEFAULT_LAYOUT) -> CostModel:
+    # Strategies running on the same layout share one read-only cost model
+    return CostModel(layout)
@@ -0,0 +1,127 @@
+import heapq
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Iterable, List, Tuple
+
+from src.cost_model import operation_legs
+from src.instrumentation import OUTPUT, OperationRecord
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+
+# Replays the operations a strategy took (as recorded by src/instrumentation.py) with several forklifts sharing
+# the aisles. Each day the inputs are handled first and the outputs start once every input is stored, like in
+# the exercise; forklifts take the next operation as soon as they are free, earliest free forklift first.
+#
+# Congestion: each aisle has one lane and is divided in one cell per bay. A forklift lifting at a bay blocks
+# that cell, and any other forklift has to wait for the lift to end before crossing or lifting in it.
+# Operations reserve their lift in dispatch order, so earlier operations keep their priority.
+
+
+@dataclass
+class FleetReport:
+    forklifts: int
+    operations: int = 0
+    days: int = 0
+    makespan: float = 0.0  # Sum over the days of the time until the last operation of the day is done
+    busy_times: List[float] = field(default_factory=list)  # Per forklift, waits for congestion included
+    congestion_wait: float = 0.0
+
+    @property
+    def utilization(self) -> float:
+        return sum(self.busy_times) / (self.forklifts * self.makespan) if self.makespan else 0.0
+
+
+class ForkliftScheduler:
+    def __init__(self, layout: WarehouseLayout = DEFAULT_LAYOUT, forklifts: int = 1, congestion: bool = True):
+        if forklifts < 1:
+            raise ValueError("forklifts must be at least 1")
+        self.layout = layout
+        self.forklifts = forklifts
+        self.congestion = congestion
+
+    def schedule(self, records: Iterable[OperationRecord]) -> FleetReport:
+        report = FleetReport(self.forklifts, busy_times=[0.0] * self.forklifts)
+        done = [record for record in records if record.slot is not None]
+        for _, day_records in groupby(done, key=lambda record: record.day):
+            report.days += 1
+            for operation, phase in groupby(day_records, key=lambda record: record.operation):
+                slots = [record.slot for record in phase]
+                report.operations += len(slots)
+                report.makespan += self._run_phase(slots, operation == OUTPUT, report)
+        return report
+
+    def _run_phase(self, slots: List[Tuple[int, int, int, int]], is_output: bool, report: FleetReport) -> float:
+        # Event queue of (time the forklift is free, forklift); every forklift starts the phase at its area
+        events = [(0.0, forklift) for forklift in range(self.forklifts)]
+        # Lift reservations per bay of each aisle, indexed aisle * bays_per_rack + bay
+        lifts: List[List[Tuple[float, float]]] = [[] for _ in range(self.layout.aisles * self.layout.bays_per_rack)]
+        end = 0.0
+        for slot in slots:
+            start, forklift = heapq.heappop(events)
+            finish, wait = self._round_trip(start, slot, is_output, lifts)
+            report.busy_times[forklift] += finish - start
+            report.congestion_wait += wait
+            heapq.heappush(events, (finish, forklift))
+            end = max(end, finish)
+        return end
+
+    def _round_trip(
+        self, start: float, slot: Tuple[int, int, int, int], is_output: bool, lifts: List[List[Tuple[float, float]]]
+    ) -> Tuple[float, float]:
+        # Returns when the forklift is back at its area and how long it waited behind other forklifts
+        layout = self.layout
+        rack_num, bay_num, shelf_num, pallet_pos = slot
+        one_way_distance, vertical_time = operation_legs(bay_num, shelf_num, pallet_pos, is_output, layout, rack_num)
+        speed = layout.forklift_speed
+        cell_time = layout.rack_width / speed
+
+        # Bays crossed in the pallet's aisle before reaching its bay, from the operation's area;
+        # the cross aisle leading to the aisle is not congested
+        aisle = layout.aisle_of(rack_num)
+        approach_distance = layout.distance_to_areas + aisle * layout.aisle_spacing
+        steps = layout.bays_per_rack - bay_num - 1 if is_output else bay_num
+        path = [aisle * layout.bays_per_rack + (layout.bays_per_rack - 1 - step if is_output else step) for step in range(steps)]
+        inside_bay_time = (one_way_distance - approach_distance - steps * layout.rack_width) / speed
+        bay_cell = aisle * layout.bays_per_rack + bay_num
+
+        time, wait = start + approach_distance / speed, 0.0
+        for cell in path:
+            time, wait = self._wait_for(lifts[cell], start, time, cell_time, wait)
+            time += cell_time
+        time += inside_bay_time
+
+        time, wait = self._wait_for(lifts[bay_cell], start, time, vertical_time, wait)
+        if self.congestion and vertical_time > 0:
+            lifts[bay_cell].append((time, time + vertical_time))
+        time += vertical_time
+
+        time += inside_bay_time
+        for cell in reversed(path):
+            time, wait = self._wait_for(lifts[cell], start, time, cell_time, wait)
+            time += cell_time
+        return time + approach_distance / speed, wait
+
+    def _wait_for(
+        self, lifts: List[Tuple[float, float]], start: float, time: float, duration: float, wait: float
+    ) -> Tuple[float, float]:
+        # Delays [time, time + duration) until it overlaps none of the lifts reserved in the cell. Trips are
+        # dispatched in order of their start, so lifts ended before this trip's start cannot block any later one.
+        if not self.congestion:
+            return time, wait
+        lifts[:] = [lift for lift in lifts if lift[1] > start]
+        blocked = True
+        while blocked:
+            blocked = False
+            for lift_start, lift_end in lifts:
+                if lift_start < time + duration and time < lift_end:
+                    wait += lift_end - time
+                    time = lift_end
+                    blocked = True
+        return time, wait
+
+
+def fleet_report(warehouse, forklifts: int, congestion: bool = True) -> FleetReport:
+    # Schedules the operations recorded for an instrumented warehouse (see instrumentation.instrument)
+    recorder = getattr(warehouse, "recorder", None)
+    if recorder is None or recorder.total != len(recorder):
+        raise ValueError(f"{warehouse.__class__.__name__} needs a recorder holding every operation of its run")
+    return ForkliftScheduler(warehouse.layout, forklifts, congestion).schedule(recorder)
@@ -0,0 +1,88 @@
+import json
+import os
+from dataclasses import asdict
+from typing import Dict, Optional
+
+from src.log_cache import date_ordinal, file_digest
+
+# End state of a simulation kept between runs, so that a run over logs that only gained new days since the
+# previous one resumes from where that one stopped instead of replaying the whole history. The directory holds
+# the Simulator.save_checkpoint snapshots and a manifest recording what they were computed from: the layout,
+# strategies and options, and for each log the bytes read (size and SHA-256 of that prefix) and the number
+# of rows dated up to the last simulated day. The state is only reused when the logs still start with the same
+# bytes and no row was added to an already simulated day; anything else falls back to a full replay.
+MANIFEST = "manifest.json"
+_VERSION = 1
+
+
+def run_key(simulator) -> dict:
+    # What the end state depends on besides the logs
+    return {
+        "version": _VERSION,
+        "layout": asdict(simulator.layout),
+        "strategies": [f"{type(warehouse).__module__}.{type(warehouse).__qualname__}" for warehouse in simulator.warehouses],
+        "optimize_batches": simulator.optimize_batches,
+        "seed": simulator.seed,
+    }
+
+
+def last_day(operations) -> Optional[int]:
+    day = None
+    for date, _ in operations.items():
+        day = date
+    return None if day is None else date_ordinal(day)
+
+
+def _rows_through(operations, day: int) -> Dict[str, int]:
+    rows = {"input": 0, "output": 0}
+    for _, day_operations in operations.days_between(None, day).items():
+        for input_output in rows:
+            rows[input_output] += len(day_operations[input_output])
+    return rows
+
+
+def save_run(simulator, directory: str, log_sizes: Dict[str, int]):
+    # log_sizes are the sizes of the input/output logs taken before the simulator read them
+    day = last_day(simulator.operations_by_date)
+    simulator.save_checkpoint(directory, day)
+    rows = _rows_through(simulator.operations_by_date, day) if day is not None else {"input": 0, "output": 0}
+    logs = {}
+    for input_output, path in simulator.log_paths.items():
+        size = log_sizes[input_output]
+        logs[input_output] = {
+            "path": os.path.abspath(path),
+            "size": size,
+            "sha256": file_digest(path, size).hex(),
+            "rows": rows[input_output],
+        }
+    manifest = dict(run_key(simulator), day=day, logs=logs)
+
+    # Written last and renamed, so the manifest never describes snapshots that were not fully written
+    temporary_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(temporary_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, os.path.join(directory, MANIFEST))
+
+
+def resume_run(simulator, directory: str) -> Optional[int]:
+    # Restores the warehouses of the simulator from the saved state and returns the last day it covers,
+    # or returns None (leaving the warehouses untouched) when the state cannot be reused
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if any(manifest.get(name) != value for name, value in run_key(simulator).items()) or manifest.get("day") is None:
+        return None
+
+    for input_output, path in simulator.log_paths.items():
+        log = manifest["logs"][input_output]
+        if os.path.getsize(path) < log["size"] or file_digest(path, log["size"]).hex() != log["sha256"]:
+            return None
+    if _rows_through(simulator.operations_by_date, manifest["day"]) != {name: log["rows"] for name, log in manifest["logs"].items()}:
+        return None
+
+    try:
+        return simulator.restore_checkpoint(directory)
+    except (OSError, ValueError):
+        return None
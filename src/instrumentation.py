@@ -0,0 +1,114 @@
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.classes import CATEGORIES_BY_CODE, CATEGORY_CODES, Category
+
+# Opt-in per-operation records. A warehouse is instrumented by giving it a `recorder` attribute (see instrument());
+# the batch functions and simulate_warehouse only look it up once per batch/run, so uninstrumented runs are unchanged.
+
+INPUT = 0
+OUTPUT = 1
+NO_DAY = -1
+
+
+class OperationRecord(NamedTuple):
+    day: int  # Date ordinal, NO_DAY outside of simulate_warehouse
+    operation: int  # INPUT or OUTPUT
+    category: Category
+    slot: Optional[Tuple[int, int, int, int]]  # None when the operation failed
+    cost: float
+    candidates: int  # Index entries (or free slots, for optimized batches) examined to take the decision
+    seconds: float  # Wall-clock time of the decision
+
+
+OperationCallback = Callable[[OperationRecord], None]
+
+_COLUMNS = {
+    "day": "i",
+    "operation": "B",
+    "category": "B",
+    "rack": "i",
+    "bay": "i",
+    "shelf": "i",
+    "position": "i",
+    "cost": "d",
+    "candidates": "I",
+    "seconds": "d",
+}
+
+
+class OperationRecorder:
+    # Stores records column by column in typed arrays. With a capacity it behaves as a ring buffer keeping
+    # the latest `capacity` operations. Callbacks are called with every record as it is taken; when the
+    # simulation runs in worker processes they run in the worker, so they have to be picklable.
+    def __init__(self, capacity: Optional[int] = None, callbacks: Iterable[OperationCallback] = ()):
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.callbacks: List[OperationCallback] = list(callbacks)
+        self.day = NO_DAY
+        self.total = 0  # Operations recorded so far, including the ones dropped by the ring buffer or clear()
+        self._start = 0  # Index of the oldest record once the ring buffer is full
+        self._columns: Dict[str, array] = {name: array(typecode) for name, typecode in _COLUMNS.items()}
+
+    def add_callback(self, callback: OperationCallback):
+        self.callbacks.append(callback)
+
+    def record(
+        self,
+        operation: int,
+        category: Category,
+        slot: Optional[Tuple[int, int, int, int]],
+        cost: float,
+        candidates: int,
+        seconds: float,
+    ):
+        rack_num, bay_num, shelf_num, pallet_pos = (-1, -1, -1, -1) if slot is None else slot
+        values = (self.day, operation, CATEGORY_CODES[category], rack_num, bay_num, shelf_num, pallet_pos, cost, candidates, seconds)
+        if self.capacity is None or len(self) < self.capacity:
+            for column, value in zip(self._columns.values(), values):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns.values(), values):
+                column[self._start] = value
+            self._start = (self._start + 1) % self.capacity
+        self.total += 1
+
+        if self.callbacks:
+            record = OperationRecord(self.day, operation, category, slot, cost, candidates, seconds)
+            for callback in self.callbacks:
+                callback(record)
+
+    def __len__(self) -> int:
+        return len(self._columns["day"])
+
+    def columns(self) -> Dict[str, array]:
+        # Copies of the columns in chronological order
+        start = self._start
+        return {name: column[start:] + column[:start] for name, column in self._columns.items()}
+
+    def clear(self):
+        for column in self._columns.values():
+            del column[:]
+        self._start = 0
+
+    def __iter__(self) -> Iterator[OperationRecord]:
+        columns = self.columns()
+        for day, operation, category, rack_num, bay_num, shelf_num, pallet_pos, cost, candidates, seconds in zip(*columns.values()):
+            slot = None if rack_num == -1 else (rack_num, bay_num, shelf_num, pallet_pos)
+            yield OperationRecord(day, operation, CATEGORIES_BY_CODE[category], slot, cost, candidates, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        columns = self.columns()
+        operations = len(columns["day"])
+        return {
+            "operations": operations,
+            "failures": sum(rack_num == -1 for rack_num in columns["rack"]),
+            "mean_candidates": sum(columns["candidates"]) / operations if operations else 0.0,
+            "decision_seconds": sum(columns["seconds"]),
+        }
+
+
+def instrument(warehouse, capacity: Optional[int] = None, callbacks: Iterable[OperationCallback] = ()) -> OperationRecorder:
+    warehouse.recorder = OperationRecorder(capacity, callbacks)
+    return warehouse.recorder
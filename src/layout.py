@@ -0,0 +1,92 @@
+import json
+from dataclasses import dataclass, fields, replace
+
+from src.constants import (
+    AISLE_SPACING,
+    BAYS_PER_RACK,
+    DISTANCE_TO_AREAS,
+    FORKLIFT_SPEED,
+    LIFT_SPEED,
+    PALLET_WIDTH,
+    PALLETS_PER_SHELF,
+    RACK_WIDTH,
+    RACKS_PER_AISLE,
+    SHELF_HEIGHT,
+    SHELVES_PER_BAY,
+)
+
+
+@dataclass(frozen=True)
+class WarehouseLayout:
+    # Geometry and equipment of a simulated warehouse; the defaults describe the exercise warehouse.
+    # Racks are grouped racks_per_aisle to an aisle. The input and output areas are at the two ends of the first
+    # aisle, and a cross aisle along each end leads to the other aisles, aisle_spacing meters apart; within an
+    # aisle, operation times only depend on bay, shelf and pallet position.
+    racks: int = 2
+    bays_per_rack: int = BAYS_PER_RACK
+    shelves_per_bay: int = SHELVES_PER_BAY
+    pallets_per_shelf: int = PALLETS_PER_SHELF
+    forklift_speed: float = FORKLIFT_SPEED  # m/s
+    lift_speed: float = LIFT_SPEED  # m/s
+    distance_to_areas: float = DISTANCE_TO_AREAS  # meters
+    rack_width: float = RACK_WIDTH  # meters
+    shelf_height: float = SHELF_HEIGHT  # meters
+    pallet_width: float = PALLET_WIDTH  # meters
+    racks_per_aisle: int = RACKS_PER_AISLE
+    aisle_spacing: float = AISLE_SPACING  # meters
+
+    def __post_init__(self):
+        for name in ("racks", "bays_per_rack", "shelves_per_bay", "pallets_per_shelf", "racks_per_aisle"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1")
+        if self.aisle_spacing < 0:
+            raise ValueError("aisle_spacing must not be negative")
+
+    @property
+    def aisles(self) -> int:
+        return -(-self.racks // self.racks_per_aisle)
+
+    def aisle_of(self, rack_num: int) -> int:
+        return rack_num // self.racks_per_aisle
+
+    @property
+    def top_shelf(self) -> int:
+        return self.shelves_per_bay - 1
+
+    @property
+    def slots_per_bay(self) -> int:
+        return self.shelves_per_bay * self.pallets_per_shelf
+
+    @property
+    def slots_per_rack(self) -> int:
+        return self.bays_per_rack * self.slots_per_bay
+
+    @property
+    def total_shelves(self) -> int:
+        return self.racks * self.bays_per_rack * self.shelves_per_bay
+
+    @property
+    def total_slots(self) -> int:
+        return self.racks * self.slots_per_rack
+
+    def shelf_offset(self, rack_num: int, bay_num: int, shelf_num: int) -> int:
+        return ((rack_num * self.bays_per_rack + bay_num) * self.shelves_per_bay + shelf_num) * self.pallets_per_shelf
+
+    def scaled(self, racks: int = 1, bays: int = 1) -> "WarehouseLayout":
+        # Same warehouse with the number of racks and bays multiplied, used to simulate bigger sites;
+        # the extra racks go to extra aisles
+        return replace(self, racks=self.racks * racks, bays_per_rack=self.bays_per_rack * bays)
+
+
+DEFAULT_LAYOUT = WarehouseLayout()
+
+
+def load_layout(path: str) -> WarehouseLayout:
+    # JSON object with any of the WarehouseLayout fields, e.g. {"racks": 4, "bays_per_rack": 50}; others keep their default
+    with open(path) as f:
+        config = json.load(f)
+
+    unknown = set(config) - {field.name for field in fields(WarehouseLayout)}
+    if unknown:
+        raise ValueError(f"{path}: unknown layout fields {', '.join(sorted(unknown))}")
+    return WarehouseLayout(**config)
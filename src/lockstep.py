@@ -0,0 +1,204 @@
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.classes import CATEGORY_CODES, EMPTY_SLOT, can_accept_category
+from src.cost_model import get_cost_model
+from src.layout import WarehouseLayout
+from src.snapshot import Snapshot
+from src.strategy import WarehouseStrategy
+
+# Simulates many independent runs (strategy x scenario sweeps) in one process, stepping them through their days
+# together. Every run keeps its occupancy in "orders": one segment per run of a shared bytearray per order, holding
+# the slots sorted the way the run's strategy ranks them. A placement is then the first empty byte of the category's
+# free order and a retrieval the first byte with the category code in the occupied order, both found with
+# bytearray.find, instead of going through the heap indexes pallet by pallet. This is not vectorized: runs and
+# pallets are still stepped one at a time in Python, the saving is that each step is a single find.
+#
+# This gives the exact slots of the scalar strategies when their keys only depend on the slot: free_slot_key must
+# not decrease along a shelf (so its first free position is also its lowest key) and must not give the same key
+# to two shelves (the heap would break the tie by insertion order). Greedy, LIFO, FIFO and Fill_Middle qualify.
+# Runs track occupancy and operation times; pallet IDs, arrival days and dwell times are not kept.
+
+
+class SlotOrders:
+    # Per strategy class and layout: the slots (WarehouseState indexes) in free order per category and in
+    # occupied order, and where each slot sits in every order
+    def __init__(self, warehouse: WarehouseStrategy):
+        layout = warehouse.layout
+        positions = [
+            (rack_num, bay_num, shelf_num, pallet_pos)
+            for rack_num in range(layout.racks)
+            for bay_num in range(layout.bays_per_rack)
+            for shelf_num in range(layout.shelves_per_bay)
+            for pallet_pos in range(layout.pallets_per_shelf)
+        ]
+        free_keys = [(warehouse.free_slot_key(*position), position[3]) for position in positions]
+        occupied_keys = [(warehouse.occupied_slot_key(*position), position) for position in positions]
+
+        shelves_by_key: Dict[tuple, Tuple[int, int, int]] = {}
+        for slot, (key, pallet_pos) in enumerate(free_keys):
+            shelf = positions[slot][:3]
+            if shelves_by_key.setdefault(key, shelf) != shelf:
+                raise ValueError(f"{warehouse.__class__.__name__} gives the same free_slot_key to several shelves")
+            if pallet_pos > 0 and key < free_keys[slot - 1][0]:
+                raise ValueError(f"{warehouse.__class__.__name__} ranks later positions of a shelf before its first free one")
+
+        self.free: Dict[int, List[int]] = {}
+        for category, code in CATEGORY_CODES.items():
+            accepting = [slot for slot, position in enumerate(positions) if can_accept_category(position[2], category, layout)]
+            self.free[code] = sorted(accepting, key=free_keys.__getitem__)
+        self.occupied: List[int] = sorted(range(len(positions)), key=occupied_keys.__getitem__)
+
+        # The free orders come first, in CATEGORY_CODES order, then the occupied order;
+        # locations[slot] holds (order number, index of the slot in that order)
+        self.orders: List[List[int]] = list(self.free.values()) + [self.occupied]
+        self.free_numbers = {code: number for number, code in enumerate(self.free)}
+        self.locations: List[List[Tuple[int, int]]] = [[] for _ in positions]
+        for number, slots in enumerate(self.orders):
+            for index, slot in enumerate(slots):
+                self.locations[slot].append((number, index))
+
+
+@lru_cache(maxsize=None)
+def _slot_orders(warehouse_class: type, layout: WarehouseLayout) -> SlotOrders:
+    return SlotOrders(warehouse_class(layout))
+
+
+def supports(warehouse) -> Optional[str]:
+    # Returns why the warehouse cannot run in lockstep, or None when it can
+    warehouse_class = type(warehouse)
+    if not isinstance(warehouse, WarehouseStrategy):
+        return f"{warehouse_class.__name__} is not a WarehouseStrategy"
+    if (
+        warehouse_class.place_batch is not WarehouseStrategy.place_batch
+        or warehouse_class.retrieve_batch is not WarehouseStrategy.retrieve_batch
+    ):
+        return f"{warehouse_class.__name__} has its own batch operations"
+    if warehouse.retrieval_order is not None:
+        return f"{warehouse_class.__name__} retrieves pallets by arrival"
+    if getattr(warehouse, "recorder", None) is not None or getattr(warehouse, "result_writer", None) is not None:
+        return f"{warehouse_class.__name__} is instrumented"
+    try:
+        _slot_orders(warehouse_class, warehouse.layout)
+    except ValueError as error:
+        return str(error)
+    return None
+
+
+class LockstepEngine:
+    # Runs the given warehouses, each from its current state and operation times, over their own operations
+    def __init__(self, warehouses: List[WarehouseStrategy]):
+        for warehouse in warehouses:
+            reason = supports(warehouse)
+            if reason is not None:
+                raise ValueError(f"Cannot run in lockstep: {reason}")
+        if len({warehouse.layout for warehouse in warehouses}) > 1:
+            raise ValueError("Warehouses of a lockstep run must share their layout")
+
+        self.layout = warehouses[0].layout if warehouses else None
+        self.slot_orders = [_slot_orders(type(warehouse), warehouse.layout) for warehouse in warehouses]
+        self.input_operation_times = [warehouse.input_operation_time for warehouse in warehouses]
+        self.output_operation_times = [warehouse.output_operation_time for warehouse in warehouses]
+        self.failures = {"input": [0] * len(warehouses), "output": [0] * len(warehouses)}
+
+        # Order lengths only depend on the layout, so run k owns bytes [k * length, (k + 1) * length) of each order
+        lengths = [len(slots) for slots in self.slot_orders[0].orders] if warehouses else []
+        self.orders = [bytearray(length * len(warehouses)) for length in lengths]
+        for run, (warehouse, slot_orders) in enumerate(zip(warehouses, self.slot_orders)):
+            state = bytes(warehouse.state.slots)
+            for order, length, slots in zip(self.orders, lengths, slot_orders.orders):
+                order[run * length : (run + 1) * length] = bytes(state[slot] for slot in slots)
+        self._lengths = lengths
+
+    def run(self, operations_per_run: List[dict]):
+        # operations_per_run[k] is an operations_by_date-like mapping for warehouse k; each step gives every run its next day
+        days: List[Iterator] = [iter(operations.items()) for operations in operations_per_run]
+        active = list(range(len(days)))
+        while active:
+            still_active = []
+            for run in active:
+                day = next(days[run], None)
+                if day is None:
+                    continue
+                operations = day[1]
+                self._place(run, operations["input"])
+                self._retrieve(run, operations["output"])
+                still_active.append(run)
+            active = still_active
+
+    def _place(self, run: int, pallets: list):
+        slot_orders = self.slot_orders[run]
+        input_times = _flat_times(self.layout, False)
+        orders, lengths = self.orders, self._lengths
+
+        input_operation_time = self.input_operation_times[run]
+        for pallet in pallets:
+            code = CATEGORY_CODES[pallet.category]
+            number = slot_orders.free_numbers[code]
+            start = run * lengths[number]
+            index = orders[number].find(EMPTY_SLOT, start, start + lengths[number])
+            if index == -1:
+                self.failures["input"][run] += 1
+                continue
+
+            slot = slot_orders.free[code][index - start]
+            for order_number, order_index in slot_orders.locations[slot]:
+                orders[order_number][run * lengths[order_number] + order_index] = code
+            input_operation_time += input_times[slot]
+        self.input_operation_times[run] = input_operation_time
+
+    def _retrieve(self, run: int, pallet_requests: list):
+        slot_orders = self.slot_orders[run]
+        output_times = _flat_times(self.layout, True)
+        orders, lengths = self.orders, self._lengths
+        occupied_number = len(lengths) - 1
+        occupied = orders[occupied_number]
+        start = run * lengths[occupied_number]
+        stop = start + lengths[occupied_number]
+
+        output_operation_time = self.output_operation_times[run]
+        for pallet_request in pallet_requests:
+            index = occupied.find(CATEGORY_CODES[pallet_request.category], start, stop)
+            if index == -1:
+                self.failures["output"][run] += 1
+                continue
+
+            slot = slot_orders.occupied[index - start]
+            for order_number, order_index in slot_orders.locations[slot]:
+                orders[order_number][run * lengths[order_number] + order_index] = EMPTY_SLOT
+            output_operation_time += output_times[slot]
+        self.output_operation_times[run] = output_operation_time
+
+    def state(self, run: int) -> bytes:
+        # Occupancy of the run in WarehouseState order
+        occupied_number = len(self._lengths) - 1
+        length = self._lengths[occupied_number]
+        codes = self.orders[occupied_number][run * length : (run + 1) * length]
+        slots = bytearray(length)
+        for index, slot in enumerate(self.slot_orders[run].occupied):
+            slots[slot] = codes[index]
+        return bytes(slots)
+
+    def snapshot(self, run: int, day: Optional[int] = None) -> Snapshot:
+        # Can be restored into a warehouse of any strategy to go on with the scalar simulation
+        return Snapshot(self.layout, self.state(run), self.input_operation_times[run], self.output_operation_times[run], day)
+
+    def results(self) -> List[dict]:
+        return [
+            {"input": input_time, "output": output_time, "total": input_time + output_time}
+            for input_time, output_time in zip(self.input_operation_times, self.output_operation_times)
+        ]
+
+
+@lru_cache(maxsize=None)
+def _flat_times(layout: WarehouseLayout, is_output: bool) -> List[float]:
+    # Operation time of every slot, indexed like WarehouseState
+    cost_model = get_cost_model(layout)
+    times = cost_model.output_times if is_output else cost_model.input_times
+    return [
+        times[rack_num][bay_num][shelf_num][pallet_pos]
+        for rack_num in range(layout.racks)
+        for bay_num in range(layout.bays_per_rack)
+        for shelf_num in range(layout.shelves_per_bay)
+        for pallet_pos in range(layout.pallets_per_shelf)
+    ]
@@ -0,0 +1,139 @@
+import csv
+import hashlib
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from datetime import date as Date
+from itertools import groupby
+from typing import Iterator, List, Optional, Tuple
+
+from src.classes import CATEGORIES_BY_CODE, CATEGORY_CODES, Europallet
+
+CACHE_DIR = ".cache/logs"
+
+# Cache file layout: header, newline-separated distinct dates, then one uint32 date index and one category code per row
+_MAGIC = b"WHLOG1"
+_HEADER = struct.Struct("<6sQq32sII")
+_CODES_BY_NAME = {category.value: code for category, code in CATEGORY_CODES.items()}
+
+
+def date_ordinal(date: str) -> int:
+    # Log dates are written as d/m/yyyy
+    day, month, year = date.split("/")
+    return Date(int(year), int(month), int(day)).toordinal()
+
+
+@dataclass
+class ColumnarLog:
+    # A log as two parallel columns: the index of each row's date in `dates` and the row's category code
+    dates: List[str]
+    date_indices: array
+    categories: array
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def iter_days(self) -> Iterator[Tuple[str, List[Europallet]]]:
+        # Yields the pallets grouped by consecutive dates, like operations.iter_log
+        row = 0
+        for date_index, rows in groupby(self.date_indices):
+            count = sum(1 for _ in rows)
+            date = self.dates[date_index]
+            arrival = date_ordinal(date)
+            yield date, [Europallet(CATEGORIES_BY_CODE[code], arrival) for code in self.categories[row : row + count]]
+            row += count
+
+
+def parse_log(path: str) -> ColumnarLog:
+    dates: List[str] = []
+    date_numbers = {}
+    date_indices = array("I")
+    categories = array("B")
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date_column, category_column = header.index("Date"), header.index("Category")
+        for row in reader:
+            date = row[date_column]
+            date_index = date_numbers.get(date)
+            if date_index is None:
+                date_index = date_numbers[date] = len(dates)
+                dates.append(date)
+            date_indices.append(date_index)
+            categories.append(_CODES_BY_NAME[row[category_column]])
+
+    return ColumnarLog(dates, date_indices, categories)
+
+
+def file_digest(path: str, size: Optional[int] = None) -> bytes:
+    # SHA-256 of the file, or of its first `size` bytes
+    digest = hashlib.sha256()
+    remaining = size
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.digest()
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{name}.bin")
+
+
+def _read_cache(cache_path: str, size: int, mtime_ns: int, source_path: str) -> Optional[ColumnarLog]:
+    try:
+        with open(cache_path, "rb") as f:
+            magic, cached_size, cached_mtime_ns, digest, dates_length, rows = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                return None
+            # A touched but unchanged file is still a hit, only the content hash has to be checked
+            if (cached_size, cached_mtime_ns) != (size, mtime_ns) and (cached_size != size or digest != file_digest(source_path)):
+                return None
+
+            dates = f.read(dates_length).decode().split("\n") if dates_length else []
+            date_indices = array("I")
+            date_indices.frombytes(f.read(rows * date_indices.itemsize))
+            categories = array("B")
+            categories.frombytes(f.read(rows))
+    except (OSError, struct.error):
+        return None
+
+    if len(categories) != rows or len(date_indices) != rows:
+        return None
+    return ColumnarLog(dates, date_indices, categories)
+
+
+def _write_cache(cache_path: str, size: int, mtime_ns: int, digest: bytes, log: ColumnarLog):
+    dates = "\n".join(log.dates).encode()
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temporary_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, size, mtime_ns, digest, len(dates), len(log)))
+            f.write(dates)
+            f.write(log.date_indices.tobytes())
+            f.write(log.categories.tobytes())
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        # The cache is only an accelerator, an unwritable cache directory must not break loading
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def load_log(path: str, cache_dir: str = CACHE_DIR) -> ColumnarLog:
+    # Loads a log from its binary cache when the source is unchanged, otherwise parses it and refreshes the cache
+    stat = os.stat(path)
+    cache_path = _cache_path(path, cache_dir)
+    log = _read_cache(cache_path, stat.st_size, stat.st_mtime_ns, path)
+    if log is None:
+        digest = file_digest(path)
+        log = parse_log(path)
+        _write_cache(cache_path, stat.st_size, stat.st_mtime_ns, digest, log)
+    return log
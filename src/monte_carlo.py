@@ -0,0 +1,150 @@
+import math
+import random
+import statistics
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from src.classes import Category, Europallet, can_accept_category
+from src.layout import WarehouseLayout
+from src.operations import SEED_DATE, DailyOperations, date_ordinal, seed_pallets
+
+# Monte-Carlo scenarios: daily input/output counts per category are fitted from the logs as Poisson rates,
+# then synthetic months are sampled from them and simulated like the recorded one.
+
+
+@dataclass
+class DemandModel:
+    # Mean number of pallets per day for each transaction ("input"/"output") and category
+    rates: Dict[str, Dict[Category, float]]
+    days: int
+    first_day: int = field(default_factory=lambda: date_ordinal(SEED_DATE) + 1)
+    # Slots able to hold each category and in total; inputs that could never fit are not sampled
+    capacity: Optional[Dict[Category, int]] = None
+    total_capacity: Optional[int] = None
+
+
+def fit_demand(operations: DailyOperations, layout: Optional[WarehouseLayout] = None) -> DemandModel:
+    # The seed day only holds the pre-existing pallets, the rates are fitted on the days after it
+    days = operations.days_between(first=date_ordinal(SEED_DATE) + 1)
+    counts = {input_output: {category: 0 for category in Category} for input_output in ("input", "output")}
+    for _, day_operations in days.iter_days():
+        for input_output, pallets in day_operations.items():
+            for pallet in pallets:
+                counts[input_output][pallet.category] += 1
+
+    day_count = len(days.days)
+    rates = {
+        input_output: {category: count / day_count if day_count else 0.0 for category, count in category_counts.items()}
+        for input_output, category_counts in counts.items()
+    }
+    model = DemandModel(rates, day_count, days.first_day or date_ordinal(SEED_DATE) + 1)
+    if layout is not None:
+        shelves_per_level = layout.racks * layout.bays_per_rack * layout.pallets_per_shelf
+        model.capacity = {
+            category: shelves_per_level * sum(can_accept_category(level, category, layout) for level in range(layout.shelves_per_bay))
+            for category in Category
+        }
+        model.total_capacity = layout.total_slots
+    return model
+
+
+def _poisson(rng: random.Random, rate: float) -> int:
+    # Knuth's method for the small daily rates of the logs, a normal approximation for large scaled workloads
+    if rate <= 0:
+        return 0
+    if rate > 50:
+        return max(round(rng.gauss(rate, math.sqrt(rate))), 0)
+    limit, count, product = math.exp(-rate), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def sample_month(model: DemandModel, rng: random.Random) -> DailyOperations:
+    # One synthetic month starting with the pre-existing pallets. Outputs never ask for more pallets of a category
+    # than are in stock and inputs stay within the slots their category may use, so any failure left in a run
+    # comes from where the placement strategy put the pallets.
+    operations = DailyOperations()
+    stock = {category: 0 for category in Category}
+    for pallet in seed_pallets():
+        stock[pallet.category] += 1
+    operations.add(SEED_DATE, "input", seed_pallets())
+
+    for day in range(model.first_day, model.first_day + model.days):
+        inputs, outputs = [], []
+        for category, rate in model.rates["input"].items():
+            count = _poisson(rng, rate)
+            if model.capacity is not None:
+                count = max(min(count, model.capacity[category] - stock[category], model.total_capacity - sum(stock.values())), 0)
+            inputs.extend(Europallet(category, day) for _ in range(count))
+            stock[category] += count
+        for category, rate in model.rates["output"].items():
+            count = min(_poisson(rng, rate), stock[category])
+            outputs.extend(Europallet(category, day) for _ in range(count))
+            stock[category] -= count
+
+        # Inputs arrive mixed during the day, like in the logs
+        rng.shuffle(inputs)
+        rng.shuffle(outputs)
+        operations.add(day, "input", inputs)
+        operations.add(day, "output", outputs)
+    return operations
+
+
+def sample_months(model: DemandModel, count: int, seed: int = 0, start: int = 0) -> Iterator[DailyOperations]:
+    # Each month has its own generator, so month i is the same whichever chunk it is sampled in
+    for index in range(start, start + count):
+        yield sample_month(model, random.Random(f"{seed}-{index}"))
+
+
+def run_monte_carlo(
+    simulator,
+    model: DemandModel,
+    months: int,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 100,
+    lockstep: bool = False,
+) -> Dict[str, List[float]]:
+    # Simulates every strategy of the simulator over `months` sampled months and returns the total operation
+    # times as totals[strategy][month]. Months are sampled and run chunk by chunk to bound memory; with lockstep,
+    # the runs of a chunk are stepped together in this process (see Simulator.run_scenarios).
+    totals: Dict[str, List[float]] = {}
+    for start in range(0, months, chunk_size):
+        count = min(chunk_size, months - start)
+        scenarios = {f"month {start + index}": operations for index, operations in enumerate(sample_months(model, count, seed, start))}
+        for strategies in simulator.run_scenarios(scenarios, workers, lockstep).values():
+            for strategy, times in strategies.items():
+                totals.setdefault(strategy, []).append(times["total"])
+    return totals
+
+
+def summarize(totals: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for strategy, values in totals.items():
+        summary[strategy] = {
+            "mean": statistics.fmean(values),
+            "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "p5": _percentile(values, 5),
+            "p95": _percentile(values, 95),
+        }
+    return summary
+
+
+def _percentile(values: List[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], months: int):
+    print(f"\nTotal operation times over {months} sampled months per placement strategy (sorted by mean):\n")
+    for strategy, stats in sorted(summary.items(), key=lambda x: x[1]["mean"]):
+        print(
+            f"{strategy}:"
+            f" \tMean: {stats['mean']:.2f} seconds"
+            f" \tStdev: {stats['stdev']:.2f} seconds"
+            f" \tP5: {stats['p5']:.2f} seconds"
+            f" \tP95: {stats['p95']:.2f} seconds"
+        )
@@ -0,0 +1,181 @@
+import csv
+from collections.abc import Mapping
+from datetime import date as Date
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.classes import Category, Europallet
+from src.log_cache import CACHE_DIR, date_ordinal, load_log
+
+INPUT_LOG = "static/warehouse_log_inputs.csv"
+OUTPUT_LOG = "static/warehouse_log_outputs.csv"
+SEED_DATE = "31/8/2023"
+
+DayOperations = Dict[str, List[Europallet]]
+
+
+def seed_pallets() -> List[Europallet]:
+    # Pre-existing pallets to satisfy output orders, all arrived on the seed date
+    arrival = date_ordinal(SEED_DATE)
+    return [Europallet(category, arrival) for category in (Category.A, Category.B, Category.C) for _ in range(20)]
+
+
+def format_date(ordinal: int) -> str:
+    day = Date.fromordinal(ordinal)
+    return f"{day.day}/{day.month}/{day.year}"
+
+
+class DailyOperations(Mapping):
+    # Operations indexed by day ordinal: days[ordinal - first_day] holds that day's {"input": [...], "output": [...]}
+    # or None when nothing happened. Iterating follows the calendar whatever order the logs were loaded in,
+    # and it still reads like the former dict keyed by "d/m/yyyy" strings.
+    def __init__(self, first_day: Optional[int] = None, days: Optional[List[Optional[DayOperations]]] = None):
+        self.first_day = first_day
+        self.days: List[Optional[DayOperations]] = [] if days is None else days
+        self._ordinals: Dict[str, int] = {}
+
+    def ordinal(self, date: Union[str, int]) -> int:
+        if isinstance(date, int):
+            return date
+        ordinal = self._ordinals.get(date)
+        if ordinal is None:
+            ordinal = self._ordinals[date] = date_ordinal(date)
+        return ordinal
+
+    def add(self, date: Union[str, int], input_output: str, pallets: List[Europallet]):
+        ordinal = self.ordinal(date)
+        if self.first_day is None:
+            self.first_day = ordinal
+        elif ordinal < self.first_day:
+            self.days[:0] = [None] * (self.first_day - ordinal)
+            self.first_day = ordinal
+
+        index = ordinal - self.first_day
+        if index >= len(self.days):
+            self.days.extend([None] * (index + 1 - len(self.days)))
+        if self.days[index] is None:
+            self.days[index] = {"input": [], "output": []}
+        self.days[index][input_output].extend(pallets)
+
+    def days_between(self, first: Union[str, int, None] = None, last: Union[str, int, None] = None) -> "DailyOperations":
+        # Operations from the first to the last day included, located by index instead of searching
+        if self.first_day is None:
+            return DailyOperations()
+        start = 0 if first is None else max(self.ordinal(first) - self.first_day, 0)
+        stop = len(self.days) if last is None else max(self.ordinal(last) - self.first_day + 1, start)
+        return DailyOperations(self.first_day + start, self.days[start:stop])
+
+    def iter_days(self) -> Iterator[Tuple[int, DayOperations]]:
+        for index, operations in enumerate(self.days):
+            if operations is not None:
+                yield self.first_day + index, operations
+
+    def items(self) -> Iterator[Tuple[str, DayOperations]]:
+        for ordinal, operations in self.iter_days():
+            yield format_date(ordinal), operations
+
+    def __getitem__(self, date: Union[str, int]) -> DayOperations:
+        index = -1 if self.first_day is None else self.ordinal(date) - self.first_day
+        if index < 0 or index >= len(self.days) or self.days[index] is None:
+            raise KeyError(date)
+        return self.days[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return (date for date, _ in self.items())
+
+    def __len__(self) -> int:
+        return sum(operations is not None for operations in self.days)
+
+
+def iter_log(path: str) -> Iterator[Tuple[str, List[Europallet]]]:
+    # Yields the pallets of a log grouped by consecutive dates, holding a single day in memory
+    with open(path) as f:
+        reader = csv.DictReader(f)
+        for date, rows in groupby(reader, key=lambda row: row["Date"]):
+            arrival = date_ordinal(date)
+            yield date, [Europallet(Category(row["Category"]), arrival) for row in rows]
+
+
+def load_operations(
+    input_path: str = INPUT_LOG, output_path: str = OUTPUT_LOG, cache_dir: Optional[str] = CACHE_DIR, seed: bool = True
+) -> DailyOperations:
+    # Without seed, the warehouse is expected to start from a snapshot instead of the pre-existing pallets
+    operations = DailyOperations()
+    if seed:
+        operations.add(SEED_DATE, "input", seed_pallets())
+
+    # Import data from csv files, through their binary cache unless cache_dir is None
+    for input_output, path in [("input", input_path), ("output", output_path)]:
+        days = iter_log(path) if cache_dir is None else load_log(path, cache_dir).iter_days()
+        for date, pallets in days:
+            operations.add(date, input_output, pallets)
+
+    return operations
+
+
+class OperationLog:
+    # Streams the operations of a pair of date-sorted logs day by day, merging inputs and outputs lazily.
+    # It exposes items() like an operations_by_date dict, only holds the current day in memory and
+    # can be iterated again (each call reopens the files), which also makes it cheap to send to worker processes.
+    def __init__(
+        self,
+        input_path: str = INPUT_LOG,
+        output_path: str = OUTPUT_LOG,
+        seed: bool = True,
+        first_day: Optional[int] = None,
+        last_day: Optional[int] = None,
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.seed = seed
+        self.first_day = first_day
+        self.last_day = last_day
+
+    def days_between(self, first: Union[str, int, None] = None, last: Union[str, int, None] = None) -> "OperationLog":
+        # Same as DailyOperations.days_between; days outside the range are skipped while streaming
+        first = date_ordinal(first) if isinstance(first, str) else first
+        last = date_ordinal(last) if isinstance(last, str) else last
+        if self.first_day is not None:
+            first = self.first_day if first is None else max(first, self.first_day)
+        if self.last_day is not None:
+            last = self.last_day if last is None else min(last, self.last_day)
+        return OperationLog(self.input_path, self.output_path, self.seed, first, last)
+
+    def items(self) -> Iterator[Tuple[str, DayOperations]]:
+        inputs = self._iter_sorted(self.input_path)
+        if self.seed:
+            inputs = self._chain_seed(inputs)
+        outputs = self._iter_sorted(self.output_path)
+
+        next_input = next(inputs, None)
+        next_output = next(outputs, None)
+        while next_input is not None or next_output is not None:
+            ordinal = min(day[0] for day in (next_input, next_output) if day is not None)
+            if self.last_day is not None and ordinal > self.last_day:
+                return
+
+            operations = {"input": [], "output": []}
+            while next_input is not None and next_input[0] == ordinal:
+                operations["input"].extend(next_input[1])
+                next_input = next(inputs, None)
+            while next_output is not None and next_output[0] == ordinal:
+                operations["output"].extend(next_output[1])
+                next_output = next(outputs, None)
+            if self.first_day is None or ordinal >= self.first_day:
+                yield format_date(ordinal), operations
+
+    @staticmethod
+    def _chain_seed(days: Iterator[Tuple[int, List[Europallet]]]) -> Iterator[Tuple[int, List[Europallet]]]:
+        yield date_ordinal(SEED_DATE), seed_pallets()
+        yield from days
+
+    @staticmethod
+    def _iter_sorted(path: str) -> Iterator[Tuple[int, List[Europallet]]]:
+        # Yields (day ordinal, pallets), making sure the log can be merged without sorting it
+        previous_ordinal: Optional[int] = None
+        for date, pallets in iter_log(path):
+            ordinal = date_ordinal(date)
+            if previous_ordinal is not None and ordinal < previous_ordinal:
+                raise ValueError(f"{path} is not sorted by date ({date} found after an earlier date)")
+            previous_ordinal = ordinal
+            yield ordinal, pallets
@@ -0,0 +1,132 @@
+import hashlib
+import inspect
+import json
+import os
+from dataclasses import asdict
+from functools import lru_cache
+from importlib import import_module
+from typing import Dict, Optional
+
+from src.classes import EMPTY_SLOT
+from src.log_cache import file_digest
+
+RESULT_CACHE_DIR = ".cache/results"
+
+# Results of whole-log runs stored by content: an entry is named after the SHA-256 of everything the result
+# depends on (the source of the strategy class and of the simulation modules, the strategy parameters, the layout,
+# the logs and the simulator options), so any change to one of them simply misses and is simulated again.
+# Entries are small JSON files; reading one refreshes its mtime, and the least recently used are removed once
+# the directory grows beyond max_bytes.
+_VERSION = 1
+# Every module the simulation of a run imports; strategy modules are added per strategy class
+_SIMULATION_MODULES = (
+    "src.batch",
+    "src.classes",
+    "src.constants",
+    "src.cost_model",
+    "src.instrumentation",
+    "src.layout",
+    "src.log_cache",
+    "src.operations",
+    "src.simulation",
+    "src.slot_index",
+    "src.strategy",
+)
+_RUN_ATTRIBUTES = ("input_operation_time", "output_operation_time")
+
+
+@lru_cache(maxsize=None)
+def _source_digest(module_name: str) -> str:
+    path = inspect.getsourcefile(import_module(module_name))
+    return file_digest(path).hex() if path else module_name
+
+
+@lru_cache(maxsize=None)
+def strategy_digest(warehouse_class: type) -> str:
+    # Covers the modules of every class the strategy inherits from, so editing a base class also invalidates it
+    digest = hashlib.sha256()
+    for module_name in _SIMULATION_MODULES:
+        digest.update(_source_digest(module_name).encode())
+    for cls in warehouse_class.__mro__[:-1]:
+        digest.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+        digest.update(_source_digest(cls.__module__).encode())
+    return digest.hexdigest()
+
+
+def cacheable(warehouse) -> bool:
+    # Only runs from an empty, uninstrumented warehouse depend on nothing else than the key
+    if getattr(warehouse, "recorder", None) is not None or getattr(warehouse, "result_writer", None) is not None:
+        return False
+    slots = warehouse.state.slots
+    return slots.count(EMPTY_SLOT) == len(slots) and warehouse.input_operation_time == 0 and warehouse.output_operation_time == 0
+
+
+def result_key(warehouse, log_digests: Dict[str, str], optimize_batches: bool, seed: bool) -> str:
+    # Scalar attributes such as Warehouse_Optimal.output_weight are strategy parameters
+    parameters = {
+        name: value
+        for name, value in vars(warehouse).items()
+        if isinstance(value, (bool, int, float, str)) and name not in _RUN_ATTRIBUTES
+    }
+    key = {
+        "version": _VERSION,
+        "strategy": strategy_digest(type(warehouse)),
+        "parameters": parameters,
+        "layout": asdict(warehouse.layout),
+        "logs": log_digests,
+        "optimize_batches": optimize_batches,
+        "seed": seed,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory: str = RESULT_CACHE_DIR, max_bytes: int = 16 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def put(self, key: str, result: dict):
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary_path, "w") as f:
+                json.dump(result, f)
+            os.replace(temporary_path, path)
+        except OSError:
+            # Like the log cache, an unwritable cache directory must not break the simulation
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+        self.evict()
+
+    def evict(self):
+        # Removes the least recently used entries until the cache fits in max_bytes
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
@@ -0,0 +1,225 @@
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from array import array
+from typing import Dict, List, Optional
+
+from src.instrumentation import INPUT, OperationRecorder
+
+# Simulation results as an .npz archive (one .npy array per column) written with the standard library.
+# numpy.load(path) reads it back; every array is one-dimensional and all arrays of a table have the same length.
+#
+# operations_*: one row per operation, the columns of OperationRecorder plus the strategy index
+# days_*:       one row per strategy and simulated day
+# fleet_*:      one row per strategy scheduled on several forklifts (see src/forklifts.py), empty otherwise
+# strategies:   strategy names, indexed by the strategy columns
+
+OPERATION_COLUMNS = {
+    "strategy": "H",
+    "day": "i",
+    "operation": "B",
+    "category": "B",
+    "rack": "i",
+    "bay": "i",
+    "shelf": "i",
+    "position": "i",
+    "cost": "d",
+    "candidates": "I",
+    "seconds": "d",
+}
+DAY_COLUMNS = {
+    "strategy": "H",
+    "day": "i",
+    "inputs": "I",
+    "outputs": "I",
+    "failed_inputs": "I",
+    "failed_outputs": "I",
+    "input_time": "d",
+    "output_time": "d",
+}
+FLEET_COLUMNS = {
+    "strategy": "H",
+    "forklifts": "H",
+    "makespan": "d",
+    "utilization": "d",
+    "congestion_wait": "d",
+}
+
+_NPY_KINDS = {"B": "u", "H": "u", "I": "u", "L": "u", "Q": "u", "b": "i", "h": "i", "i": "i", "l": "i", "q": "i", "f": "f", "d": "f"}
+
+
+class ResultSink:
+    # Collects the results of every strategy into one .npz file. Each strategy gets a StrategyWriter that
+    # streams its rows to temporary column files in chunks (also from worker processes); close() then
+    # concatenates them into the archive without loading them back in memory. Used as a context manager, the
+    # archive is only written when the block succeeds; the temporary files are removed either way.
+    def __init__(self, path: str, chunk_rows: int = 1 << 16):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.strategies: List[str] = []
+        self._fleet = {column: array(typecode) for column, typecode in FLEET_COLUMNS.items()}
+        self._directory = tempfile.mkdtemp(prefix=".results-", dir=os.path.dirname(os.path.abspath(path)))
+
+    def writer(self, strategy: str) -> "StrategyWriter":
+        if strategy in self.strategies:
+            raise ValueError(f"{strategy} already has a writer")
+        self.strategies.append(strategy)
+        return StrategyWriter(os.path.join(self._directory, str(len(self.strategies) - 1)), len(self.strategies) - 1, self.chunk_rows)
+
+    def add_fleet_report(self, strategy: str, report):
+        # report is the FleetReport of a strategy that has a writer
+        row = {
+            "strategy": self.strategies.index(strategy),
+            "forklifts": report.forklifts,
+            "makespan": report.makespan,
+            "utilization": report.utilization,
+            "congestion_wait": report.congestion_wait,
+        }
+        for column, value in row.items():
+            self._fleet[column].append(value)
+
+    def close(self):
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with zipfile.ZipFile(temporary_path, "w", allowZip64=True) as archive:
+                for table, columns in (("operations", OPERATION_COLUMNS), ("days", DAY_COLUMNS)):
+                    for column, typecode in columns.items():
+                        prefixes = [os.path.join(self._directory, str(index)) for index in range(len(self.strategies))]
+                        parts = [f"{prefix}.{table}.{column}" for prefix in prefixes]
+                        _write_npy(archive, f"{table}_{column}", typecode, [part for part in parts if os.path.exists(part)])
+                for column, values in self._fleet.items():
+                    with archive.open(f"fleet_{column}.npy", "w") as f:
+                        f.write(_npy_header(_npy_descr(values.typecode), len(values)))
+                        f.write(values.tobytes())
+
+                width = max((len(name) for name in self.strategies), default=1)
+                names = b"".join(name.ljust(width, "\0").encode("utf-32-le") for name in self.strategies)
+                with archive.open("strategies.npy", "w") as f:
+                    f.write(_npy_header(f"<U{width}", len(self.strategies)))
+                    f.write(names)
+            os.replace(temporary_path, self.path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+        else:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class StrategyWriter:
+    # Turns the records of one strategy run into operation and day rows. It reads the new records of the
+    # warehouse recorder after each day, installing an unbounded one it clears itself when the warehouse has none.
+    def __init__(self, prefix: str, strategy: int, chunk_rows: int):
+        self.prefix = prefix
+        self.strategy = strategy
+        self.chunk_rows = chunk_rows
+        self._recorder: Optional[OperationRecorder] = None
+        self._owns_recorder = False
+        self._drained = 0
+        self._operations = {column: array(typecode) for column, typecode in OPERATION_COLUMNS.items()}
+        self._days = {column: array(typecode) for column, typecode in DAY_COLUMNS.items()}
+
+    def attach(self, warehouse):
+        self._recorder = getattr(warehouse, "recorder", None)
+        if self._recorder is not None and self._recorder.capacity is not None:
+            raise ValueError(
+                f"{warehouse.__class__.__name__} has a ring buffer recorder, which would drop operations before they are written"
+            )
+        self._owns_recorder = self._recorder is None
+        if self._owns_recorder:
+            self._recorder = warehouse.recorder = OperationRecorder()
+        self._drained = self._recorder.total
+
+    def detach(self, warehouse):
+        self.flush()
+        if self._owns_recorder:
+            del warehouse.recorder
+        self._recorder = None
+
+    def end_day(self, day: int):
+        recorder = self._recorder
+        new = recorder.total - self._drained
+        self._drained = recorder.total
+        columns = {column: values[len(values) - new :] for column, values in recorder.columns().items()}
+        if self._owns_recorder:
+            recorder.clear()
+
+        rows = len(columns["day"])
+        self._operations["strategy"].extend([self.strategy] * rows)
+        for column, values in columns.items():
+            self._operations[column].extend(values)
+
+        totals = {"inputs": 0, "outputs": 0, "failed_inputs": 0, "failed_outputs": 0, "input_time": 0.0, "output_time": 0.0}
+        for operation, rack_num, cost in zip(columns["operation"], columns["rack"], columns["cost"]):
+            kind = "input" if operation == INPUT else "output"
+            totals[f"{kind}s"] += 1
+            totals[f"{kind}_time"] += cost
+            if rack_num == -1:
+                totals[f"failed_{kind}s"] += 1
+        self._days["strategy"].append(self.strategy)
+        self._days["day"].append(day)
+        for column, value in totals.items():
+            self._days[column].append(value)
+
+        if len(self._operations["day"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        for table, columns in (("operations", self._operations), ("days", self._days)):
+            if not len(columns["day"]):
+                continue
+            for column, values in columns.items():
+                with open(f"{self.prefix}.{table}.{column}", "ab") as f:
+                    values.tofile(f)
+                del values[:]
+
+
+def _npy_header(descr: str, length: int) -> bytes:
+    # .npy format version 1.0: magic, version, header length, then a dict literal padded to a multiple of 64 bytes
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({length},), }}"
+    header += " " * (63 - (10 + len(header)) % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+def _npy_descr(typecode: str) -> str:
+    # Columns are written in native byte order
+    return ("<" if sys.byteorder == "little" else ">") + _NPY_KINDS[typecode] + str(array(typecode).itemsize)
+
+
+def _write_npy(archive: zipfile.ZipFile, name: str, typecode: str, parts: List[str]):
+    length = sum(os.path.getsize(part) for part in parts) // array(typecode).itemsize
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+        f.write(_npy_header(_npy_descr(typecode), length))
+        for part in parts:
+            with open(part, "rb") as source:
+                shutil.copyfileobj(source, f, 1 << 20)
+
+
+def read_npz(path: str) -> Dict[str, array]:
+    # Reads back the numeric columns of an archive written by ResultSink without numpy, mainly for quick checks
+    columns = {}
+    with zipfile.ZipFile(path) as archive:
+        for name in archive.namelist():
+            with archive.open(name) as f:
+                f.read(8)
+                header = ast.literal_eval(f.read(int.from_bytes(f.read(2), "little")).decode("latin1"))
+                data = f.read()
+            if header["descr"].startswith("<U"):
+                width = int(header["descr"][2:])
+                columns[name[:-4]] = [data[i : i + 4 * width].decode("utf-32-le").rstrip("\0") for i in range(0, len(data), 4 * width)]
+                continue
+            typecode = next(code for code in "BHIQbhiqfd" if _NPY_KINDS[code] + str(array(code).itemsize) == header["descr"][1:])
+            values = array(typecode)
+            values.frombytes(data)
+            columns[name[:-4]] = values
+    return columns
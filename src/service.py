@@ -0,0 +1,352 @@
+# Online slotting service: a warehouse strategy answering "where do I put this pallet" and "which pallet do I pick"
+# for a WMS over a localhost TCP socket. Run it with `python -m src.service serve --strategy greedy`.
+#
+# Protocol: one JSON object per line in both directions, answered in request order on each connection, e.g.
+#   {"id": 1, "op": "place", "category": "A"}  ->  {"id": 1, "ok": true, "slot": [0, 3, 0, 1], "cost": 21.73, "pallet_id": 7}
+#   {"id": 2, "op": "retrieve", "category": "C"}  ->  {"id": 2, "ok": false, "error": "no pallet in stock is of Category C"}
+#   {"id": 3, "op": "stats"}  ->  {"id": 3, "ok": true, "requests": 2, "p50_ms": 0.04, "p99_ms": 0.07, ...}
+# Categories may be written "A" or "Category A"; a place request may give its own "pallet_id", an integer from 0
+# to 2**62 - 1 that is not already stored.
+#
+# Every connection only parses requests and queues them; one task owns the warehouse and takes everything queued
+# at once as a micro-batch, so state updates are serialized and concurrent requests share one place_batch or
+# retrieve_batch call. Decisions are read back from an OperationRecorder attached to the warehouse.
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from datetime import date as Date
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.classes import EMPTY_SLOT, NO_PALLET, Category, Europallet, reserve_pallet_ids
+from src.instrumentation import INPUT, instrument
+from src.layout import DEFAULT_LAYOUT, load_layout
+from src.snapshot import read_snapshot, restore_snapshot
+from src.strategy import available_strategies, get_strategy
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Generated IDs continue above the largest client ID, so client IDs stay well below the int64 limit of the state
+_MAX_PALLET_ID = 2**62 - 1
+_CATEGORIES = {**{category.name: category for category in Category}, **{category.value: category for category in Category}}
+
+
+class SlottingService:
+    def __init__(
+        self, warehouse, max_batch: int = 256, batch_window: float = 0.0, optimize: bool = False, latency_window: int = 100000
+    ):
+        # batch_window waits that many seconds after the first queued request to let a batch grow;
+        # latencies are kept for the latest latency_window requests
+        self.warehouse = warehouse
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.optimize = optimize
+        self.recorder = instrument(warehouse, capacity=max_batch)
+        self.requests = 0
+        self.batches = 0
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        # IDs of the stored pallets and of the queued placements, so that a pallet_id cannot be given twice
+        state = warehouse.state
+        stored = {state.pallet_ids[index] for index, code in enumerate(bytes(state.slots)) if code != EMPTY_SLOT}
+        self._pallet_ids = stored - {NO_PALLET}
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+        # Returns the address actually bound, port 0 picks a free port
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._process())
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        # Stops accepting connections and drops the open ones; requests they still had queued go unanswered
+        self._server.close()
+        for writer in self._connections.values():
+            writer.transport.abort()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._worker.cancel()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests of a connection are queued as soon as they are read, so a client may pipeline them;
+        # replies are written in request order
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        replies: asyncio.Queue = asyncio.Queue()
+        reply_task = asyncio.create_task(self._write_replies(replies, writer))
+        try:
+            while line := await reader.readline():
+                replies.put_nowait(self._submit(line))
+        except ConnectionError:
+            pass
+        finally:
+            replies.put_nowait(None)
+            await asyncio.gather(reply_task, return_exceptions=True)
+            writer.close()
+            del self._connections[connection]
+
+    async def _write_replies(self, replies: asyncio.Queue, writer: asyncio.StreamWriter):
+        while (reply := await replies.get()) is not None:
+            reply = await reply
+            if writer.is_closing():
+                continue
+            writer.write(json.dumps(reply).encode() + b"\n")
+            if replies.empty():
+                await writer.drain()
+
+    def _submit(self, line: bytes) -> asyncio.Future:
+        received = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("requests must be JSON objects")
+        except ValueError as error:
+            future.set_result({"id": None, "ok": False, "error": str(error)})
+            return future
+
+        operation, category, pallet_id = request.get("op"), _CATEGORIES.get(request.get("category")), request.get("pallet_id")
+        error = None
+        if operation not in ("place", "retrieve", "stats"):
+            error = f"unknown op {operation!r}, expected place, retrieve or stats"
+        elif operation != "stats" and category is None:
+            error = f"unknown category {request.get('category')!r}"
+        elif pallet_id is not None and (
+            not isinstance(pallet_id, int) or isinstance(pallet_id, bool) or not 0 <= pallet_id <= _MAX_PALLET_ID
+        ):
+            error = f"pallet_id must be an integer between 0 and {_MAX_PALLET_ID}"
+        elif operation == "place" and pallet_id in self._pallet_ids:
+            error = f"pallet {pallet_id} is already stored"
+        if error is not None:
+            future.set_result({"id": request.get("id"), "ok": False, "error": error})
+            return future
+
+        if operation == "place" and pallet_id is not None:
+            self._pallet_ids.add(pallet_id)
+            # Generated IDs must not collide with the ones given by clients
+            reserve_pallet_ids(pallet_id)
+
+        self._queue.put_nowait((operation, category, pallet_id, request.get("id"), received, future))
+        return future
+
+    async def _process(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._handle_batch(batch)
+
+    def _handle_batch(self, batch: list):
+        # Consecutive requests of the same operation go to the warehouse together, keeping the arrival order
+        self.batches += 1
+        self.recorder.day = Date.today().toordinal()
+        start = 0
+        while start < len(batch):
+            operation = batch[start][0]
+            stop = start + 1
+            while stop < len(batch) and batch[stop][0] == operation:
+                stop += 1
+            group = batch[start:stop]
+            try:
+                if operation == "stats":
+                    replies = [dict(self.stats(), ok=True) for _ in group]
+                else:
+                    replies = self._decide(operation, group)
+            except Exception as error:
+                # A failing batch is answered with the error, the service goes on with the next requests
+                replies = [{"ok": False, "error": f"{type(error).__name__}: {error}"}] * len(group)
+                if operation == "place":
+                    self._pallet_ids.difference_update(pallet_id for _, _, pallet_id, *_ in group)
+
+            done = time.perf_counter()
+            for (_, _, _, request_id, received, future), reply in zip(group, replies):
+                self.latencies.append(done - received)
+                future.set_result(dict(reply, id=request_id))
+            self.requests += len(group)
+            start = stop
+
+    def _decide(self, operation: str, group: list) -> List[dict]:
+        day = self.recorder.day
+        pallets = [
+            Europallet(category, day) if pallet_id is None else Europallet(category, day, pallet_id)
+            for _, category, pallet_id, *_ in group
+        ]
+        self.recorder.clear()
+        if operation == "place":
+            self.warehouse.place_batch(pallets, self.optimize)
+        else:
+            self.warehouse.retrieve_batch(pallets)
+
+        state = self.warehouse.state
+        replies = []
+        for pallet, record in zip(pallets, self.recorder):
+            if record.slot is None:
+                missing = "free slot accepts" if record.operation == INPUT else "pallet in stock is of"
+                replies.append({"ok": False, "error": f"no {missing} {pallet.category.value}"})
+                if operation == "place":
+                    self._pallet_ids.discard(pallet.pallet_id)
+                continue
+            # The state keeps the pallet ID of a slot after a retrieval, so it names the pallet to pick
+            pallet_id = state.pallet_ids[state.shelf_offset(*record.slot[:3]) + record.slot[3]]
+            if operation == "place":
+                self._pallet_ids.add(pallet_id)
+            else:
+                self._pallet_ids.discard(pallet_id)
+            replies.append({"ok": True, "slot": list(record.slot), "cost": record.cost, "pallet_id": pallet_id})
+        return replies
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        warehouse = self.warehouse
+        return {
+            "strategy": warehouse.name,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "stored_pallets": len(warehouse.state.slots) - bytes(warehouse.state.slots).count(0),
+            "input_operation_time": warehouse.input_operation_time,
+            "output_operation_time": warehouse.output_operation_time,
+            "mean_dwell_days": warehouse.dwell_times.mean,
+        }
+
+
+def _percentile(values: List[float], percent: int) -> float:
+    # Nearest-rank percentile of sorted values
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, -(-percent * len(values) // 100) - 1))]
+
+
+class SlottingClient:
+    # Minimal client for the service, mostly for tests and benchmarks; requests may be pipelined with gather()
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._pending: Deque[asyncio.Future] = deque()
+        self._next_id = 0
+        self._reader_task = asyncio.create_task(self._read_replies())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> "SlottingClient":
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, operation: str, **fields) -> dict:
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._writer.write(json.dumps({"id": self._next_id, "op": operation, **fields}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def place(self, category: str, pallet_id: Optional[int] = None) -> dict:
+        return await self.request("place", category=category, **({} if pallet_id is None else {"pallet_id": pallet_id}))
+
+    async def retrieve(self, category: str) -> dict:
+        return await self.request("retrieve", category=category)
+
+    async def stats(self) -> dict:
+        return await self.request("stats")
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._reader_task.cancel()
+
+    async def _read_replies(self):
+        while line := await self._reader.readline():
+            self._pending.popleft().set_result(json.loads(line))
+
+
+async def run_load(host: str, port: int, clients: int, requests: int, rate: float, seed: int = 0) -> dict:
+    # Sends `requests` place/retrieve requests from `clients` connections at about `rate` requests per second
+    # overall (0 for as fast as possible) and returns client-side latencies along with the service stats
+    rng = random.Random(seed)
+    connections = [await SlottingClient.connect(host, port) for _ in range(clients)]
+    latencies: List[float] = []
+    interval = clients / rate if rate else 0.0
+
+    async def client_loop(client: SlottingClient, count: int):
+        for _ in range(count):
+            operation = "place" if rng.random() < 0.55 else "retrieve"
+            start = time.perf_counter()
+            await client.request(operation, category=rng.choice("AABCCC"))
+            latencies.append(time.perf_counter() - start)
+            if interval:
+                await asyncio.sleep(max(interval - (time.perf_counter() - start), 0))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(client, requests // clients) for client in connections))
+    elapsed = time.perf_counter() - start
+    stats = await connections[0].stats()
+    for client in connections:
+        await client.close()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "client_p50_ms": _percentile(latencies, 50) * 1000,
+        "client_p99_ms": _percentile(latencies, 99) * 1000,
+        "service": stats,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve slotting decisions of a placement strategy on a local socket")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the service")
+    serve.add_argument("--strategy", default="greedy", help=f"placement strategy, among {', '.join(available_strategies())}")
+    serve.add_argument("--layout", help="JSON file with WarehouseLayout fields")
+    serve.add_argument("--snapshot", help="start from this warehouse snapshot instead of an empty warehouse")
+    serve.add_argument("--max-batch", type=int, default=256, help="most requests decided together")
+    serve.add_argument("--batch-window", type=float, default=0.0, help="seconds to wait for a batch to grow")
+    serve.add_argument("--optimize-batches", action="store_true", help="assign the slots of each batch of placements together")
+    load = commands.add_parser("load", help="send a synthetic load to a running service and report latencies")
+    load.add_argument("--clients", type=int, default=20)
+    load.add_argument("--requests", type=int, default=10000)
+    load.add_argument("--rate", type=float, default=500.0, help="requests per second over all clients, 0 for no limit")
+    for command in (serve, load):
+        command.add_argument("--host", default=DEFAULT_HOST)
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        print(json.dumps(asyncio.run(run_load(args.host, args.port, args.clients, args.requests, args.rate)), indent=2))
+        return
+
+    layout = DEFAULT_LAYOUT if args.layout is None else load_layout(args.layout)
+    try:
+        warehouse = get_strategy(args.strategy)(layout)
+    except KeyError as error:
+        parser.error(str(error.args[0]))
+    if args.snapshot is not None:
+        restore_snapshot(warehouse, read_snapshot(args.snapshot))
+
+    async def serve_until_stopped():
+        service = SlottingService(warehouse, args.max_batch, args.batch_window, args.optimize_batches)
+        host, port = await service.start(args.host, args.port)
+        print(f"Serving {warehouse.__class__.__name__} on {host}:{port}")
+        await service.serve_forever()
+
+    try:
+        asyncio.run(serve_until_stopped())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import sys
+from typing import Union
+
+from src.operations import OperationLog, date_ordinal
+from src.strategy import WarehouseStrategy
+
+# How a run walks the logs, apart from app.py so that src/result_cache.py can hash it with the other simulation code
+
+
+def simulate_warehouse(
+    warehouse: WarehouseStrategy, operations_by_date: Union[dict, OperationLog], optimize_batches: bool = False
+) -> WarehouseStrategy:
+    # Module-level so that it can be sent to worker processes; returns the warehouse in its final state.
+    # Each day is handed to the warehouse as one batch of inputs followed by one batch of outputs.
+    writer = getattr(warehouse, "result_writer", None)
+    if writer is not None:
+        writer.attach(warehouse)
+    recorder = getattr(warehouse, "recorder", None)
+    for date, operations in operations_by_date.items():
+        if recorder is not None:
+            recorder.day = date_ordinal(date)
+        for input_output in ["input", "output"]:
+            if input_output == "input":
+                results = warehouse.place_batch(operations[input_output], optimize_batches)
+            else:
+                results = warehouse.retrieve_batch(operations[input_output])
+            for success in results:
+                if not success:
+                    print(f"Failed to {input_output} pallet", file=sys.stderr)
+        if writer is not None:
+            writer.end_day(recorder.day)
+    if writer is not None:
+        writer.detach(warehouse)
+    return warehouse
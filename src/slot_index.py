@@ -0,0 +1,164 @@
+import heapq
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+from src.classes import CATEGORY_CODES, EMPTY_SLOT, Category, WarehouseState, can_accept_category
+
+SlotKey = Callable[[int, int, int, int], tuple]
+
+
+class FreeSlotIndex:
+    # Keeps one heap per category with every shelf that can accept it and still has space,
+    # ordered by a strategy-defined key computed from (rack, bay, shelf, first free pallet position).
+    # Heap entries are invalidated lazily: each update bumps the shelf version and stale
+    # entries are dropped once they reach the top of the heap.
+    def __init__(self, state: WarehouseState, shelf_key: SlotKey):
+        self.state = state
+        self.shelf_key = shelf_key
+        self._heaps: Dict[Category, list] = {category: [] for category in Category}
+        self._versions: Dict[Tuple[int, int, int], int] = {}
+        self._max_heap_size = 4 * state.layout.total_shelves + 16
+
+        for rack_num in range(state.layout.racks):
+            for bay_num in range(state.layout.bays_per_rack):
+                for shelf_num in range(state.layout.shelves_per_bay):
+                    self.update(rack_num, bay_num, shelf_num)
+
+    def update(self, rack_num: int, bay_num: int, shelf_num: int):
+        # Must be called every time a pallet is added to or removed from the shelf
+        position = (rack_num, bay_num, shelf_num)
+        version = self._versions.get(position, -1) + 1
+        self._versions[position] = version
+
+        pallet_pos = self.state.first_free_position(rack_num, bay_num, shelf_num)
+        if pallet_pos == -1:
+            return
+
+        entry = (self.shelf_key(rack_num, bay_num, shelf_num, pallet_pos), version, rack_num, bay_num, shelf_num, pallet_pos)
+        for category, heap in self._heaps.items():
+            if can_accept_category(shelf_num, category, self.state.layout):
+                heapq.heappush(heap, entry)
+                if len(heap) > self._max_heap_size:
+                    self._compact(heap)
+
+    def find(self, category: Category) -> Optional[Tuple[int, int, int, int]]:
+        # Returns the position of the free slot with the lowest key for the given category
+        heap = self._heaps[category]
+        while heap:
+            _, version, rack_num, bay_num, shelf_num, pallet_pos = heap[0]
+            if self._versions[(rack_num, bay_num, shelf_num)] == version:
+                return rack_num, bay_num, shelf_num, pallet_pos
+            heapq.heappop(heap)
+        return None
+
+    def pending(self, category: Category) -> int:
+        # Heap entries left for the category, stale ones included; used to count the entries a find() examined
+        return len(self._heaps[category])
+
+    def _compact(self, heap: list):
+        heap[:] = [entry for entry in heap if self._versions[(entry[2], entry[3], entry[4])] == entry[1]]
+        heapq.heapify(heap)
+
+
+class OccupiedSlotIndex:
+    # Keeps one heap per category with every pallet slot holding a pallet of that category,
+    # ordered by a strategy-defined key computed from (rack, bay, shelf, pallet position).
+    # Slots emptied by a retrieval are dropped lazily once they reach the top of the heap.
+    def __init__(self, state: WarehouseState, slot_key: SlotKey):
+        self.state = state
+        self.slot_key = slot_key
+        self._heaps: Dict[Category, list] = {category: [] for category in Category}
+        self._indexed = set()
+
+        layout = state.layout
+        for slot, code in enumerate(state.slots):
+            if code != EMPTY_SLOT:
+                shelf_offset, pallet_pos = divmod(slot, layout.pallets_per_shelf)
+                rack_bay, shelf_num = divmod(shelf_offset, layout.shelves_per_bay)
+                rack_num, bay_num = divmod(rack_bay, layout.bays_per_rack)
+                self.add(rack_num, bay_num, shelf_num, pallet_pos)
+
+    def add(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int):
+        # Must be called every time a pallet is stored in the slot
+        category = self.state.category_at(rack_num, bay_num, shelf_num, pallet_pos)
+        slot = (category, rack_num, bay_num, shelf_num, pallet_pos)
+        if slot in self._indexed:
+            return
+
+        self._indexed.add(slot)
+        entry = (self.slot_key(rack_num, bay_num, shelf_num, pallet_pos), rack_num, bay_num, shelf_num, pallet_pos)
+        heapq.heappush(self._heaps[category], entry)
+
+    def find(self, category: Category) -> Optional[Tuple[int, int, int, int]]:
+        # Returns the position of the occupied slot with the lowest key for the given category
+        heap = self._heaps[category]
+        code = CATEGORY_CODES[category]
+        slots = self.state.slots
+        while heap:
+            _, rack_num, bay_num, shelf_num, pallet_pos = heap[0]
+            if slots[self.state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos] == code:
+                return rack_num, bay_num, shelf_num, pallet_pos
+            heapq.heappop(heap)
+            self._indexed.discard((category, rack_num, bay_num, shelf_num, pallet_pos))
+        return None
+
+    def pending(self, category: Category) -> int:
+        return len(self._heaps[category])
+
+
+class ArrivalQueues:
+    # Keeps one deque per category with the slots holding a pallet of that category in arrival order: the oldest
+    # pallet at the left end, the newest at the right end, so FIFO and LIFO retrievals take O(1) per pallet.
+    # Placements arrive day by day, so appending on the right keeps the order. Entries remember the pallet ID:
+    # slots emptied (or refilled) since are dropped lazily once they reach the end being served.
+    def __init__(self, state: WarehouseState, newest_first: bool = False):
+        self.state = state
+        self.newest_first = newest_first
+        self._queues: Dict[Category, deque] = {category: deque() for category in Category}
+        self._max_queue_size = 2 * state.layout.total_slots + 16
+
+        # Pallets already stored are queued by arrival day then ID, unknown arrivals counting as the oldest
+        layout = state.layout
+        stored = sorted(
+            (state.arrival_days[slot], state.pallet_ids[slot], slot) for slot, code in enumerate(state.slots) if code != EMPTY_SLOT
+        )
+        for _, _, slot in stored:
+            shelf_offset, pallet_pos = divmod(slot, layout.pallets_per_shelf)
+            rack_bay, shelf_num = divmod(shelf_offset, layout.shelves_per_bay)
+            rack_num, bay_num = divmod(rack_bay, layout.bays_per_rack)
+            self.add(rack_num, bay_num, shelf_num, pallet_pos)
+
+    def add(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int):
+        # Must be called every time a pallet is stored in the slot
+        category = self.state.category_at(rack_num, bay_num, shelf_num, pallet_pos)
+        pallet_id = self.state.pallet_ids[self.state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos]
+        queue = self._queues[category]
+        queue.append((pallet_id, rack_num, bay_num, shelf_num, pallet_pos))
+        if len(queue) > self._max_queue_size:
+            # Stale entries can pile up away from the end being served, e.g. behind newer pallets with LIFO
+            code = CATEGORY_CODES[category]
+            entries = [entry for entry in queue if self._holds(entry, code)]
+            queue.clear()
+            queue.extend(entries)
+
+    def find(self, category: Category) -> Optional[Tuple[int, int, int, int]]:
+        # Returns the position of the oldest (or newest) stored pallet of the given category
+        queue = self._queues[category]
+        code = CATEGORY_CODES[category]
+        while queue:
+            entry = queue[-1] if self.newest_first else queue[0]
+            if self._holds(entry, code):
+                return entry[1:]
+            if self.newest_first:
+                queue.pop()
+            else:
+                queue.popleft()
+        return None
+
+    def pending(self, category: Category) -> int:
+        return len(self._queues[category])
+
+    def _holds(self, entry: tuple, code: int) -> bool:
+        pallet_id, rack_num, bay_num, shelf_num, pallet_pos = entry
+        index = self.state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos
+        return self.state.slots[index] == code and self.state.pallet_ids[index] == pallet_id
@@ -0,0 +1,231 @@
+import copy
+import csv
+import os
+import struct
+import sys
+from array import array
+from dataclasses import astuple, dataclass
+from typing import Optional
+
+from src.classes import (
+    CATEGORIES_BY_CODE,
+    CATEGORY_CODES,
+    EMPTY_SLOT,
+    NO_PALLET,
+    UNKNOWN_DAY,
+    Category,
+    DwellTimes,
+    can_accept_category,
+    reserve_pallet_ids,
+)
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+
+# Snapshot file layout: header (layout, accumulated operation times, last simulated day, slot count),
+# then the warehouse state as one category code per pallet slot, in WarehouseState order, followed by the
+# pallet IDs (int64) and arrival days (int32) of every slot and the dwell time counters (int64), little-endian.
+# WHSNP2 headers lack the aisle fields of the layout, and WHSNP1 files also stop after the codes.
+_MAGIC = b"WHSNP3"
+_MAGIC_V2 = b"WHSNP2"
+_MAGIC_V1 = b"WHSNP1"
+_HEADER = struct.Struct("<6s4I6dId2dqI")
+_HEADER_V2 = struct.Struct("<6s4I6d2dqI")
+_NO_DAY = 0
+_DWELL_COUNTERS = 3 * len(CATEGORIES_BY_CODE)
+
+
+@dataclass
+class Snapshot:
+    # Occupancy and accumulated operation times of a warehouse after `day` (a date ordinal, None if unknown).
+    # It does not depend on the placement strategy, so any Warehouse_* built for the same layout can restore it.
+    layout: WarehouseLayout
+    slots: bytes
+    input_operation_time: float = 0
+    output_operation_time: float = 0
+    day: Optional[int] = None
+    # Per slot, like WarehouseState; None when unknown (inventories, WHSNP1 files)
+    pallet_ids: Optional[array] = None
+    arrival_days: Optional[array] = None
+    dwell_times: Optional[DwellTimes] = None
+
+
+def take_snapshot(warehouse, day: Optional[int] = None) -> Snapshot:
+    state = warehouse.state
+    return Snapshot(
+        warehouse.layout,
+        bytes(state.slots),
+        warehouse.input_operation_time,
+        warehouse.output_operation_time,
+        day,
+        array("q", state.pallet_ids),
+        array("i", state.arrival_days),
+        warehouse.dwell_times.copy(),
+    )
+
+
+def restore_snapshot(warehouse, snapshot: Snapshot):
+    # Overwrites the warehouse state and operation times in place and rebuilds its slot indexes
+    if warehouse.layout != snapshot.layout:
+        raise ValueError(f"{warehouse.__class__.__name__} was built for a different layout than the snapshot")
+
+    state = warehouse.state
+    state.slots[:] = snapshot.slots
+    state.pallet_ids[:] = array("q", [NO_PALLET]) * len(snapshot.slots) if snapshot.pallet_ids is None else snapshot.pallet_ids
+    state.arrival_days[:] = array("i", [UNKNOWN_DAY]) * len(snapshot.slots) if snapshot.arrival_days is None else snapshot.arrival_days
+    if snapshot.pallet_ids:
+        reserve_pallet_ids(max(snapshot.pallet_ids))
+    warehouse.input_operation_time = snapshot.input_operation_time
+    warehouse.output_operation_time = snapshot.output_operation_time
+    warehouse.dwell_times = DwellTimes() if snapshot.dwell_times is None else snapshot.dwell_times.copy()
+    warehouse.free_slots = warehouse.make_free_index()
+    warehouse.occupied_slots = warehouse.make_occupied_index()
+    return warehouse
+
+
+def fork_warehouse(warehouse, warehouse_class=None):
+    # Branches the warehouse, as the same strategy or as warehouse_class, sharing its state copy-on-write:
+    # a branch only costs memory for the pages it changes, plus its slot indexes once it is first used
+    if warehouse_class is None or warehouse_class is type(warehouse):
+        branch = copy.copy(warehouse)
+        # Branches start uninstrumented, they must not write into the recorder or result file of the original
+        vars(branch).pop("recorder", None)
+        vars(branch).pop("result_writer", None)
+    else:
+        branch = warehouse_class(warehouse.layout)
+        if branch.layout != warehouse.layout:
+            raise ValueError(f"{warehouse_class.__name__} cannot be built for the layout of {warehouse.__class__.__name__}")
+
+    branch.state = warehouse.state.fork()
+    branch.racks = branch.state.racks
+    branch.input_operation_time = warehouse.input_operation_time
+    branch.output_operation_time = warehouse.output_operation_time
+    branch.dwell_times = warehouse.dwell_times.copy()
+    branch.free_slots = _LazyIndex(branch, "free_slots", "make_free_index")
+    branch.occupied_slots = _LazyIndex(branch, "occupied_slots", "make_occupied_index")
+    return branch
+
+
+class _LazyIndex:
+    # Stands in for a slot index of a forked warehouse and replaces itself with the real index on first use
+    __slots__ = ("_owner", "_name", "_builder_name")
+
+    def __init__(self, owner, name: str, builder_name: str):
+        self._owner = owner
+        self._name = name
+        self._builder_name = builder_name
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        index = getattr(self._owner, self._builder_name)()
+        setattr(self._owner, self._name, index)
+        return getattr(index, attr)
+
+
+def write_snapshot(snapshot: Snapshot, path: str):
+    header = _HEADER.pack(
+        _MAGIC,
+        *astuple(snapshot.layout),
+        snapshot.input_operation_time,
+        snapshot.output_operation_time,
+        _NO_DAY if snapshot.day is None else snapshot.day,
+        len(snapshot.slots),
+    )
+    length = len(snapshot.slots)
+    pallet_ids = array("q", [NO_PALLET]) * length if snapshot.pallet_ids is None else array("q", snapshot.pallet_ids)
+    arrival_days = array("i", [UNKNOWN_DAY]) * length if snapshot.arrival_days is None else array("i", snapshot.arrival_days)
+    dwell_times = DwellTimes() if snapshot.dwell_times is None else snapshot.dwell_times
+    dwell_counters = array("q", dwell_times.counts + dwell_times.totals + dwell_times.longest)
+    if sys.byteorder == "big":
+        pallet_ids.byteswap()
+        arrival_days.byteswap()
+        dwell_counters.byteswap()
+
+    # Written next to the target and renamed, so an interrupted checkpoint never leaves a truncated file behind
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        f.write(snapshot.slots)
+        f.write(pallet_ids.tobytes())
+        f.write(arrival_days.tobytes())
+        f.write(dwell_counters.tobytes())
+    os.replace(temporary_path, path)
+
+
+def read_snapshot(path: str) -> Snapshot:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic = data[: len(_MAGIC)]
+    if magic not in (_MAGIC, _MAGIC_V2, _MAGIC_V1):
+        raise ValueError(f"{path} is not a warehouse snapshot")
+    header = _HEADER if magic == _MAGIC else _HEADER_V2
+    try:
+        _, *fields = header.unpack_from(data)
+    except struct.error:
+        raise ValueError(f"{path} is not a warehouse snapshot") from None
+
+    if magic == _MAGIC:
+        layout, fields = WarehouseLayout(*fields[:12]), fields[12:]
+    else:
+        # Older snapshots were taken when every rack faced the same aisle
+        layout = WarehouseLayout(*fields[:10], racks_per_aisle=max(fields[0], DEFAULT_LAYOUT.racks_per_aisle))
+        fields = fields[10:]
+    input_operation_time, output_operation_time, day, length = fields
+    expected_size = header.size + (length if magic == _MAGIC_V1 else 13 * length + 8 * _DWELL_COUNTERS)
+    if length != layout.total_slots or len(data) != expected_size:
+        raise ValueError(f"{path} is truncated or does not match its layout")
+
+    start = header.size
+    slots = data[start : start + length]
+    pallet_ids = arrival_days = dwell_times = None
+    if magic != _MAGIC_V1:
+        pallet_ids = array("q", data[start + length : start + 9 * length])
+        arrival_days = array("i", data[start + 9 * length : start + 13 * length])
+        dwell_counters = array("q", data[start + 13 * length :])
+        if sys.byteorder == "big":
+            pallet_ids.byteswap()
+            arrival_days.byteswap()
+            dwell_counters.byteswap()
+        dwell_times = DwellTimes()
+        size = len(CATEGORIES_BY_CODE)
+        dwell_times.counts, dwell_times.totals, dwell_times.longest = (
+            list(dwell_counters[i : i + size]) for i in range(0, _DWELL_COUNTERS, size)
+        )
+    return Snapshot(
+        layout,
+        slots,
+        input_operation_time,
+        output_operation_time,
+        None if day == _NO_DAY else day,
+        pallet_ids,
+        arrival_days,
+        dwell_times,
+    )
+
+
+def load_inventory(path: str, layout: WarehouseLayout = DEFAULT_LAYOUT, day: Optional[int] = None) -> Snapshot:
+    # Builds a snapshot from an inventory export with Rack, Bay, Shelf and Category columns (0-based numbers,
+    # categories written like in the logs). An optional Position column pins the pallet position on the shelf,
+    # otherwise pallets fill their shelf from the first free position.
+    slots = bytearray(layout.total_slots)
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            rack_num, bay_num, shelf_num = int(row["Rack"]), int(row["Bay"]), int(row["Shelf"])
+            category = Category(row["Category"])
+            if not (0 <= rack_num < layout.racks and 0 <= bay_num < layout.bays_per_rack and 0 <= shelf_num < layout.shelves_per_bay):
+                raise ValueError(f"{path}:{line}: shelf ({rack_num}, {bay_num}, {shelf_num}) is outside the layout")
+            if not can_accept_category(shelf_num, category, layout):
+                raise ValueError(f"{path}:{line}: {category.value} is not allowed on shelf {shelf_num}")
+
+            offset = layout.shelf_offset(rack_num, bay_num, shelf_num)
+            if row.get("Position") not in (None, ""):
+                pallet_pos = int(row["Position"])
+                if not 0 <= pallet_pos < layout.pallets_per_shelf or slots[offset + pallet_pos] != EMPTY_SLOT:
+                    raise ValueError(f"{path}:{line}: position {pallet_pos} is not a free slot of its shelf")
+            else:
+                pallet_pos = slots.find(EMPTY_SLOT, offset, offset + layout.pallets_per_shelf) - offset
+                if pallet_pos < 0:
+                    raise ValueError(f"{path}:{line}: shelf ({rack_num}, {bay_num}, {shelf_num}) is already full")
+            slots[offset + pallet_pos] = CATEGORY_CODES[category]
+
+    return Snapshot(layout, bytes(slots), day=day)
@@ -0,0 +1,148 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from src.batch import place_batch, retrieve_batch
+from src.classes import CATEGORY_CODES, UNKNOWN_DAY, DwellTimes, Europallet, WarehouseState
+from src.cost_model import get_cost_model
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.slot_index import ArrivalQueues, FreeSlotIndex, OccupiedSlotIndex
+
+# Strategies are looked up by name: built-in ones are imported on first use, subclasses declared with
+# `class MyStrategy(WarehouseStrategy, name="mine")` register themselves, and installed packages can
+# expose more under the ENTRY_POINT_GROUP entry point group, e.g. in their pyproject.toml:
+#   [project.entry-points."warehouse_optimization.strategies"]
+#   mine = "my_package.strategies:MyStrategy"
+ENTRY_POINT_GROUP = "warehouse_optimization.strategies"
+
+BUILTIN_STRATEGIES = {
+    "lifo": "src.warehouse_lifo:Warehouse_LIFO",
+    "fifo": "src.warehouse_fifo:Warehouse_FIFO",
+    "greedy": "src.warehouse_greedy:Warehouse_Greedy",
+    "fill_ends": "src.warehouse_fill_ends:Warehouse_Fill_Ends",
+    "fill_middle": "src.warehouse_fill_middle:Warehouse_Fill_Middle",
+    "optimal": "src.warehouse_optimal:Warehouse_Optimal",
+    "fifo_age": "src.warehouse_fifo:Warehouse_FIFO_Age",
+    "lifo_age": "src.warehouse_lifo:Warehouse_LIFO_Age",
+}
+
+_registry: Dict[str, Type["WarehouseStrategy"]] = {}
+
+
+class WarehouseStrategy:
+    # Shared state, cost model, slot indexes and batch operations of every placement strategy.
+    # A strategy only ranks slots: free_slot_key orders the free slots a pallet may go to (its first free
+    # position on each shelf), occupied_slot_key the stored pallets a request may take; lowest key first.
+    # Attributes used by the keys must be set before calling WarehouseStrategy.__init__, which builds the indexes.
+    # A retrieval_order of "oldest" or "newest" retrieves stored pallets by arrival instead of occupied_slot_key.
+    name: str = ""
+    retrieval_order: Optional[str] = None
+
+    def __init_subclass__(cls, name: Optional[str] = None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if name is not None:
+            cls.name = name
+            register_strategy(name, cls)
+
+    def __init__(self, layout: WarehouseLayout = DEFAULT_LAYOUT):
+        self.layout = layout
+        self.state = WarehouseState(layout)
+        self.racks = self.state.racks
+        self.cost_model = get_cost_model(layout)
+        self.input_operation_time = 0
+        self.output_operation_time = 0
+        self.dwell_times = DwellTimes()
+        self.free_slots = self.make_free_index()
+        self.occupied_slots = self.make_occupied_index()
+
+    def make_free_index(self) -> FreeSlotIndex:
+        return FreeSlotIndex(self.state, self.free_slot_key)
+
+    def make_occupied_index(self) -> Union[OccupiedSlotIndex, ArrivalQueues]:
+        if self.retrieval_order is None:
+            return OccupiedSlotIndex(self.state, self.occupied_slot_key)
+        if self.retrieval_order not in ("oldest", "newest"):
+            raise ValueError(f"Unknown retrieval order {self.retrieval_order!r}, expected 'oldest' or 'newest'")
+        return ArrivalQueues(self.state, newest_first=self.retrieval_order == "newest")
+
+    def free_slot_key(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int) -> tuple:
+        raise NotImplementedError
+
+    # By default stored pallets are ranked by output time, ties broken by bay, then rack and shelf
+    def occupied_slot_key(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int) -> tuple:
+        return (self.cost_model.output_times[rack_num][bay_num][shelf_num][pallet_pos], bay_num, rack_num, shelf_num, pallet_pos)
+
+    def find_free_slot(self, pallet: Europallet) -> Optional[Tuple[int, int, int, int]]:
+        return self.free_slots.find(pallet.category)
+
+    def find_stored_pallet(self, pallet_request: Europallet) -> Optional[Tuple[int, int, int, int]]:
+        return self.occupied_slots.find(pallet_request.category)
+
+    def place_pallet(self, pallet: Europallet) -> bool:
+        position = self.find_free_slot(pallet)
+        if position is None:
+            return False
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        success = self.state.add_pallet(rack_num, bay_num, shelf_num, pallet)
+        if not success:
+            return False
+        self.free_slots.update(rack_num, bay_num, shelf_num)
+        self.occupied_slots.add(rack_num, bay_num, shelf_num, pallet_pos)
+
+        self.input_operation_time += self.cost_model.input_times[rack_num][bay_num][shelf_num][pallet_pos]
+        return True
+
+    def retrieve_pallet(self, pallet_request: Europallet) -> bool:
+        position = self.find_stored_pallet(pallet_request)
+        if position is None:
+            return False
+
+        rack_num, bay_num, shelf_num, pallet_pos = position
+        arrival = self.state.arrival_days[self.state.shelf_offset(rack_num, bay_num, shelf_num) + pallet_pos]
+        if arrival != UNKNOWN_DAY and pallet_request.arrival != UNKNOWN_DAY:
+            self.dwell_times.record(CATEGORY_CODES[pallet_request.category], pallet_request.arrival - arrival)
+        self.state.remove_pallet(rack_num, bay_num, shelf_num, pallet_pos)
+        self.free_slots.update(rack_num, bay_num, shelf_num)
+
+        self.output_operation_time += self.cost_model.output_times[rack_num][bay_num][shelf_num][pallet_pos]
+        return True
+
+    # Places a whole day of pallets; optimize=True chooses their slots together instead of one by one
+    def place_batch(self, pallets: List[Europallet], optimize: bool = False) -> List[bool]:
+        return place_batch(self, pallets, optimize)
+
+    def retrieve_batch(self, pallet_requests: List[Europallet]) -> List[bool]:
+        return retrieve_batch(self, pallet_requests)
+
+
+def register_strategy(name: str, strategy_class: Type[WarehouseStrategy]):
+    registered = _registry.get(name)
+    if registered is not None and registered is not strategy_class:
+        raise ValueError(f"Strategy {name!r} is already registered to {registered.__module__}.{registered.__qualname__}")
+    _registry[name] = strategy_class
+
+
+def get_strategy(name: str) -> Type[WarehouseStrategy]:
+    if name in _registry:
+        return _registry[name]
+
+    if name in BUILTIN_STRATEGIES:
+        module_name, class_name = BUILTIN_STRATEGIES[name].split(":")
+        strategy_class = getattr(import_module(module_name), class_name)
+    else:
+        matches = [entry_point for entry_point in entry_points(group=ENTRY_POINT_GROUP) if entry_point.name == name]
+        if not matches:
+            raise KeyError(f"Unknown strategy {name!r}, available: {', '.join(available_strategies())}")
+        strategy_class = matches[0].load()
+
+    register_strategy(name, strategy_class)
+    return strategy_class
+
+
+def available_strategies() -> List[str]:
+    names = list(BUILTIN_STRATEGIES)
+    for name in list(_registry) + [entry_point.name for entry_point in entry_points(group=ENTRY_POINT_GROUP)]:
+        if name not in names:
+            names.append(name)
+    return names
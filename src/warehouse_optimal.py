@@ -0,0 +1,33 @@
+from typing import List
+
+from src.batch import place_batch
+from src.classes import Europallet
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.strategy import WarehouseStrategy
+
+
+class Warehouse_Optimal(WarehouseStrategy, name="optimal"):
+    # Every pallet that comes in eventually goes out, so a slot is charged its input time plus output_weight times
+    # its output time (1.0 counts the full round trip). Each day of inputs is then placed as one min-cost assignment
+    # over all free slots (see src/batch.py) instead of pallet by pallet, and outputs take the pallets with the
+    # lowest output time. The assignment is only optimal for that stand-in cost: it does not look at the outputs
+    # of the day or at later days, so this is a heuristic like the others and its total is no bound on the best
+    # achievable one. The default weight is not tuned on the bundled logs, which strategies are compared on.
+    def __init__(self, layout: WarehouseLayout = DEFAULT_LAYOUT, output_weight: float = 1.0):
+        self.output_weight = output_weight
+        super().__init__(layout)
+
+    # Free slots are ranked by their weighted round-trip time, then by input time and the usual traversal order.
+    # Round-trip times are rounded so that slots differing only by float noise count as ties.
+    def free_slot_key(self, rack_num: int, bay_num: int, shelf_num: int, pallet_pos: int) -> tuple:
+        input_time = self.cost_model.input_times[rack_num][bay_num][shelf_num][pallet_pos]
+        output_time = self.cost_model.output_times[rack_num][bay_num][shelf_num][pallet_pos]
+        return (round(input_time + self.output_weight * output_time, 6), input_time, bay_num, rack_num, shelf_num)
+
+    # A single pallet simply takes the cheapest slot accepting it, which the index finds without a full scan
+    def place_pallet(self, pallet: Europallet) -> bool:
+        return place_batch(self, [pallet])[0]
+
+    # Batches are always assigned together; optimize is only accepted for compatibility with the other strategies
+    def place_batch(self, pallets: List[Europallet], optimize: bool = True) -> List[bool]:
+        return place_batch(self, pallets, optimize=len(pallets) > 1)
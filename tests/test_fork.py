@@ -0,0 +1,121 @@
+import pickle
+import random
+from array import array
+
+import pytest
+
+from src.classes import Category, Europallet, PagedSlots
+from src.snapshot import fork_warehouse, restore_snapshot, take_snapshot
+from src.strategy import BUILTIN_STRATEGIES, get_strategy
+
+# A forked branch shares the pages of its parent until it writes to them and rebuilds its slot indexes lazily;
+# it must behave exactly like a warehouse restored from a snapshot of the parent.
+
+
+def random_days(seed: int, days: int, first_id: int):
+    # Pallets carry explicit IDs and arrival days, so that runs of the same days can be compared slot by slot
+    rng = random.Random(seed)
+    pallet_ids = iter(range(first_id, first_id + 100000))
+    operations = []
+    for day in range(738000, 738000 + days):
+        inputs = [Europallet(rng.choice(list(Category)), day, next(pallet_ids)) for _ in range(rng.randint(5, 35))]
+        outputs = [Europallet(rng.choice(list(Category)), day) for _ in range(rng.randint(5, 30))]
+        operations.append((inputs, outputs))
+    return operations
+
+
+def run_days(warehouse, operations):
+    for inputs, outputs in operations:
+        warehouse.place_batch(inputs)
+        warehouse.retrieve_batch(outputs)
+    return warehouse
+
+
+def assert_same_warehouse(warehouse, other):
+    state, other_state = warehouse.state, other.state
+    assert bytes(state.slots) == bytes(other_state.slots)
+    assert list(state.pallet_ids) == list(other_state.pallet_ids)
+    assert list(state.arrival_days) == list(other_state.arrival_days)
+    assert warehouse.input_operation_time == other.input_operation_time
+    assert warehouse.output_operation_time == other.output_operation_time
+    assert warehouse.dwell_times.summary() == other.dwell_times.summary()
+
+
+def filled_warehouse(name: str):
+    return run_days(get_strategy(name)(), random_days(1, 15, first_id=10**6))
+
+
+@pytest.mark.parametrize("name", BUILTIN_STRATEGIES)
+def test_branch_matches_restored_snapshot(name):
+    warehouse = filled_warehouse(name)
+    restored = restore_snapshot(get_strategy(name)(), take_snapshot(warehouse))
+    branch = fork_warehouse(warehouse)
+
+    operations = random_days(2, 20, first_id=2 * 10**6)
+    assert_same_warehouse(run_days(branch, operations), run_days(restored, operations))
+
+
+@pytest.mark.parametrize("name", BUILTIN_STRATEGIES)
+def test_parent_is_unchanged_by_its_branches(name):
+    warehouse = filled_warehouse(name)
+    before = take_snapshot(warehouse)
+    first, second = fork_warehouse(warehouse), fork_warehouse(warehouse)
+    run_days(first, random_days(2, 20, first_id=2 * 10**6))
+    run_days(second, random_days(3, 20, first_id=3 * 10**6))
+
+    assert_same_warehouse(warehouse, restore_snapshot(get_strategy(name)(), before))
+    # The parent also goes on from where it was, with indexes that did not see the branches' operations
+    operations = random_days(4, 10, first_id=4 * 10**6)
+    assert_same_warehouse(run_days(warehouse, operations), run_days(restore_snapshot(get_strategy(name)(), before), operations))
+
+
+@pytest.mark.parametrize("name", BUILTIN_STRATEGIES)
+def test_branch_survives_pickling(name):
+    # Scenario branches are sent to worker processes; a branch may be pickled before or after its indexes are built
+    warehouse = filled_warehouse(name)
+    operations = random_days(2, 20, first_id=2 * 10**6)
+    expected = run_days(fork_warehouse(warehouse), operations)
+
+    assert_same_warehouse(run_days(pickle.loads(pickle.dumps(fork_warehouse(warehouse))), operations), expected)
+    started = run_days(fork_warehouse(warehouse), operations[:5])
+    assert_same_warehouse(run_days(pickle.loads(pickle.dumps(started)), operations[5:]), expected)
+
+
+@pytest.mark.parametrize("data", [bytearray(range(1, 23)), array("q", range(1, 23)), array("i", range(-1, 21))])
+def test_paged_writes_across_page_boundaries(data):
+    original = data[:]
+    replacement = data[:0]
+    replacement.extend(range(90, 99))
+    parent = PagedSlots(data, 4)
+    child = parent.fork()
+
+    # A slice write spanning three pages, and single writes on both sides of a page boundary
+    child[2:11] = replacement
+    child[3] = 7
+    child[4] = 8
+    expected = original[:]
+    expected[2:11] = replacement
+    expected[3], expected[4] = 7, 8
+
+    assert list(child) == list(expected)
+    assert child[1:9] == expected[1:9]
+    assert list(parent) == list(original)
+    assert parent[3:6] == original[3:6]
+    # The last page is shorter than the others
+    parent[-1] = 5
+    original[-1] = 5
+    assert list(parent) == list(original) and list(child)[-1] == expected[-1]
+    assert len(parent) == len(child) == len(original)
+
+
+def test_paged_find_across_page_boundaries():
+    slots = PagedSlots(bytes([1, 1, 1, 1, 2, 2, 2, 2, 1, 0, 1, 3]), 4)
+    branch = slots.fork()
+    branch[2] = 0
+
+    assert slots.find(0) == 9
+    assert branch.find(0) == 2
+    assert branch.find(0, 3) == 9
+    assert branch.find(3, 0, 11) == -1
+    assert branch.find(3, 5) == 11
+    assert slots.count(1) == 6 and branch.count(1) == 5
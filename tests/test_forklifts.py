@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from src.classes import Category
+from src.cost_model import calculate_operation_time, operation_legs
+from src.forklifts import ForkliftScheduler, fleet_report
+from src.instrumentation import INPUT, OUTPUT, OperationRecord, instrument
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.operations import load_operations
+from src.simulation import simulate_warehouse
+from src.strategy import get_strategy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+STRATEGIES = ["greedy", "fill_ends", "fill_middle", "lifo", "fifo", "optimal"]
+
+
+def instrumented_run(name: str, layout: WarehouseLayout = DEFAULT_LAYOUT):
+    warehouse = get_strategy(name)(layout)
+    instrument(warehouse)
+    return simulate_warehouse(warehouse, load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None))
+
+
+def record(slot, operation: int = INPUT, day: int = 738000) -> OperationRecord:
+    return OperationRecord(day, operation, Category.C, slot, 0.0, 0, 0.0)
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_one_forklift_makespan_is_the_serial_total(name):
+    warehouse = instrumented_run(name)
+    for congestion in (True, False):
+        report = fleet_report(warehouse, 1, congestion)
+        assert report.makespan == pytest.approx(warehouse.input_operation_time + warehouse.output_operation_time)
+        assert report.congestion_wait == 0
+        assert report.utilization == pytest.approx(1.0)
+
+
+def test_identical_trips_serialize_on_the_lift():
+    # Two forklifts leave together for the same shelf: the second waits for the first one's lift
+    slot = (0, 4, 2, 1)
+    trip = calculate_operation_time(4, 2, 1, False)
+    _, lift = operation_legs(4, 2, 1, False)
+
+    report = ForkliftScheduler(forklifts=2).schedule([record(slot), record(slot)])
+    assert report.congestion_wait == pytest.approx(lift)
+    assert report.makespan == pytest.approx(trip + lift)
+    assert sorted(report.busy_times) == pytest.approx([trip, trip + lift])
+
+    # A third identical trip waits for both earlier lifts, also once the first forklift is back for it
+    report = ForkliftScheduler(forklifts=3).schedule([record(slot)] * 3)
+    assert report.makespan == pytest.approx(trip + 2 * lift)
+    report = ForkliftScheduler(forklifts=2).schedule([record(slot)] * 3)
+    assert report.makespan == pytest.approx(2 * trip)
+
+    uncongested = ForkliftScheduler(forklifts=2, congestion=False).schedule([record(slot), record(slot)])
+    assert uncongested.makespan == pytest.approx(trip) and uncongested.congestion_wait == 0
+
+
+def test_lifts_stay_reserved_for_trips_dispatched_later():
+    # The first forklift lifts at bay 3; the second crosses bay 3 on its way to bay 9 and back, long after the lift
+    # ended. The third one, dispatched at the same start, reaches bay 3 during the lift and has to wait for it too.
+    layout = DEFAULT_LAYOUT
+    speed = layout.forklift_speed
+    lift_end = (layout.distance_to_areas + 3 * layout.rack_width + layout.pallet_width / 2) / speed + operation_legs(3, 3, 0, False)[1]
+    reaches_bay = (layout.distance_to_areas + 3 * layout.rack_width) / speed
+
+    report = ForkliftScheduler(layout, forklifts=3).schedule([record((0, 3, 3, 0)), record((0, 9, 0, 0)), record((0, 5, 0, 0))])
+    assert report.congestion_wait == pytest.approx(2 * (lift_end - reaches_bay))
+
+
+def test_trips_in_other_aisles_do_not_block_each_other():
+    layout = WarehouseLayout(racks=4)
+    report = ForkliftScheduler(layout, forklifts=2).schedule([record((0, 4, 2, 1), OUTPUT), record((2, 4, 2, 1), OUTPUT)])
+    assert report.congestion_wait == 0
+    assert report.makespan == pytest.approx(calculate_operation_time(4, 2, 1, True, layout, 2))
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_more_forklifts_never_increase_makespan(name):
+    warehouse = instrumented_run(name)
+    for congestion in (True, False):
+        makespans = [fleet_report(warehouse, forklifts, congestion).makespan for forklifts in range(1, 7)]
+        assert all(later <= earlier + 1e-9 for earlier, later in zip(makespans, makespans[1:])), makespans
+        assert makespans[-1] < makespans[0]
+
+
+def test_fleet_report_needs_every_operation():
+    warehouse = get_strategy("greedy")()
+    with pytest.raises(ValueError):
+        fleet_report(warehouse, 2)
+    instrument(warehouse, capacity=10)
+    simulate_warehouse(warehouse, load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None))
+    with pytest.raises(ValueError):
+        fleet_report(warehouse, 2)
+    with pytest.raises(ValueError):
+        ForkliftScheduler(forklifts=0)
@@ -0,0 +1,105 @@
+import os
+
+from app import Simulator
+from src.incremental import MANIFEST
+from src.strategy import get_strategy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRATEGIES = ["greedy", "fifo", "optimal", "lifo_age"]
+
+
+def read_log(name: str):
+    with open(os.path.join(ROOT, "static", name)) as f:
+        header, *rows = f.read().splitlines()
+    return header, rows
+
+
+def split_by_day(rows, days: int):
+    # The rows of the first `days` dates of the log, and the rest
+    dates = list(dict.fromkeys(row.split(",")[0] for row in rows))
+    first_rows = [row for row in rows if row.split(",")[0] in dates[:days]]
+    return first_rows, rows[len(first_rows) :]
+
+
+def write_logs(directory, inputs, outputs):
+    # Written like the bundled logs, without a newline after the last row
+    paths = []
+    for name, (header, rows) in (("inputs.csv", inputs), ("outputs.csv", outputs)):
+        paths.append(os.path.join(directory, name))
+        with open(paths[-1], "w") as f:
+            f.write("\n".join([header, *rows]))
+    return paths
+
+
+def append_rows(path: str, rows):
+    with open(path, "a") as f:
+        f.write("".join(f"\n{row}" for row in rows))
+
+
+def simulator(input_log: str, output_log: str) -> Simulator:
+    return Simulator([get_strategy(name)() for name in STRATEGIES], input_log=input_log, output_log=output_log, cache_dir=None)
+
+
+def full_run(input_log: str, output_log: str) -> dict:
+    run = simulator(input_log, output_log)
+    run.run_simulation()
+    return run.results
+
+
+def test_resumed_run_equals_full_run(tmp_path):
+    input_header, input_rows = read_log("warehouse_log_inputs.csv")
+    output_header, output_rows = read_log("warehouse_log_outputs.csv")
+    first_inputs, new_inputs = split_by_day(input_rows, 10)
+    first_outputs, new_outputs = split_by_day(output_rows, 10)
+    assert new_inputs and new_outputs
+    input_log, output_log = write_logs(tmp_path, (input_header, first_inputs), (output_header, first_outputs))
+    state = str(tmp_path / "state")
+
+    assert simulator(input_log, output_log).run_incremental(state) is None
+    append_rows(input_log, new_inputs)
+    append_rows(output_log, new_outputs)
+    resumed = simulator(input_log, output_log)
+    assert resumed.run_incremental(state) is not None
+    assert resumed.results == full_run(input_log, output_log)
+
+    # Without new rows the saved state covers everything
+    again = simulator(input_log, output_log)
+    assert again.run_incremental(state) is not None
+    assert again.results == resumed.results
+
+
+def test_edited_rows_replay_the_whole_log(tmp_path):
+    input_header, input_rows = read_log("warehouse_log_inputs.csv")
+    output_header, output_rows = read_log("warehouse_log_outputs.csv")
+    first_inputs, new_inputs = split_by_day(input_rows, 10)
+    first_outputs, new_outputs = split_by_day(output_rows, 10)
+    input_log, output_log = write_logs(tmp_path, (input_header, first_inputs), (output_header, first_outputs))
+    state = str(tmp_path / "state")
+    simulator(input_log, output_log).run_incremental(state)
+
+    # An already simulated row changes category, with the file keeping its size, and new days are appended
+    edited = next(number for number, row in enumerate(first_inputs) if "Category A" in row)
+    edited_rows = [row.replace("Category A", "Category C") if number == edited else row for number, row in enumerate(first_inputs)]
+    write_logs(tmp_path, (input_header, edited_rows), (output_header, first_outputs))
+    append_rows(input_log, new_inputs)
+    append_rows(output_log, new_outputs)
+
+    replayed = simulator(input_log, output_log)
+    assert replayed.run_incremental(state) is None
+    assert replayed.results == full_run(input_log, output_log)
+
+
+def test_rows_added_to_a_simulated_day_replay_the_whole_log(tmp_path):
+    input_header, input_rows = read_log("warehouse_log_inputs.csv")
+    output_header, output_rows = read_log("warehouse_log_outputs.csv")
+    first_inputs, _ = split_by_day(input_rows, 10)
+    input_log, output_log = write_logs(tmp_path, (input_header, first_inputs), (output_header, output_rows))
+    state = str(tmp_path / "state")
+    simulator(input_log, output_log).run_incremental(state)
+    assert os.path.exists(os.path.join(state, MANIFEST))
+
+    # The log grows, but with a row dated on a day the saved state already covers
+    append_rows(input_log, [first_inputs[-1]])
+    replayed = simulator(input_log, output_log)
+    assert replayed.run_incremental(state) is None
+    assert replayed.results == full_run(input_log, output_log)
@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+from src.classes import Category, Europallet
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.lockstep import LockstepEngine, supports
+from src.operations import DailyOperations, load_operations
+from src.simulation import simulate_warehouse
+from src.strategy import get_strategy
+
+# A lockstep run must match the scalar simulation exactly: same operation times, same final occupancy
+# and the same number of failed operations.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+LOCKSTEP_STRATEGIES = ["greedy", "lifo", "fifo", "fill_middle"]
+
+
+def random_days(seed: int, days: int = 40):
+    rng = random.Random(seed)
+    operations_by_date = DailyOperations()
+    for day in range(738000, 738000 + days):
+        operations_by_date.add(day, "input", [Europallet(rng.choice(list(Category))) for _ in range(rng.randint(0, 40))])
+        operations_by_date.add(day, "output", [Europallet(rng.choice(list(Category))) for _ in range(rng.randint(0, 40))])
+    return operations_by_date
+
+
+def compare_lockstep_with_scalar(capsys, layout: WarehouseLayout, scenarios: list) -> int:
+    # Returns the number of failed operations, so that callers can check their scenarios do overflow
+    runs = [(name, scenario) for name in LOCKSTEP_STRATEGIES for scenario in scenarios]
+
+    capsys.readouterr()
+    scalar = [simulate_warehouse(get_strategy(name)(layout), scenario) for name, scenario in runs]
+    scalar_failures = capsys.readouterr().err.count("Failed")
+
+    engine = LockstepEngine([get_strategy(name)(layout) for name, _ in runs])
+    engine.run([scenario for _, scenario in runs])
+
+    for run, (warehouse, result) in enumerate(zip(scalar, engine.results())):
+        assert result["input"] == warehouse.input_operation_time, runs[run][0]
+        assert result["output"] == warehouse.output_operation_time, runs[run][0]
+        assert engine.state(run) == bytes(warehouse.state.slots), runs[run][0]
+    assert sum(engine.failures["input"]) + sum(engine.failures["output"]) == scalar_failures
+    return scalar_failures
+
+
+@pytest.mark.parametrize("name", LOCKSTEP_STRATEGIES)
+def test_supported_strategies(name):
+    assert supports(get_strategy(name)()) is None
+
+
+def test_lockstep_matches_scalar_on_bundled_logs(capsys):
+    compare_lockstep_with_scalar(capsys, DEFAULT_LAYOUT, [load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None)])
+
+
+def test_lockstep_matches_scalar_on_random_scenarios(capsys):
+    assert compare_lockstep_with_scalar(capsys, DEFAULT_LAYOUT, [random_days(seed) for seed in range(10)]) > 0
+
+
+def test_lockstep_matches_scalar_with_several_aisles(capsys):
+    layout = WarehouseLayout(racks=6, bays_per_rack=7)
+    assert compare_lockstep_with_scalar(capsys, layout, [random_days(seed, days=60) for seed in range(5)]) > 0
@@ -0,0 +1,120 @@
+import os
+import shutil
+
+import pytest
+
+import src.log_cache
+from app import Simulator
+from src.log_cache import ColumnarLog, _cache_path, load_log, parse_log
+from src.operations import OperationLog, iter_log, load_operations
+from src.strategy import get_strategy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+
+
+def pallet_days(days):
+    return [(date, [(pallet.category, pallet.arrival) for pallet in pallets]) for date, pallets in days]
+
+
+def operation_days(operations):
+    return [(date, {kind: pallet_days([(date, pallets)])[0][1] for kind, pallets in day.items()}) for date, day in operations.items()]
+
+
+def assert_same_log(log: ColumnarLog, other: ColumnarLog):
+    assert (log.dates, log.date_indices, log.categories) == (other.dates, other.date_indices, other.categories)
+
+
+@pytest.fixture
+def log_copy(tmp_path):
+    path = tmp_path / "inputs.csv"
+    shutil.copyfile(INPUT_LOG, path)
+    return str(path)
+
+
+def forbid_parsing(monkeypatch):
+    def parse_log(path):
+        raise AssertionError(f"{path} was parsed instead of read from the cache")
+
+    monkeypatch.setattr(src.log_cache, "parse_log", parse_log)
+
+
+def test_cache_hit_equals_fresh_parse(tmp_path, log_copy, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    fresh = parse_log(log_copy)
+    assert_same_log(load_log(log_copy, cache_dir), fresh)
+    assert os.path.exists(_cache_path(log_copy, cache_dir))
+
+    forbid_parsing(monkeypatch)
+    cached = load_log(log_copy, cache_dir)
+    assert_same_log(cached, fresh)
+    assert pallet_days(cached.iter_days()) == pallet_days(iter_log(log_copy))
+
+    # A touched but unchanged file is still read from the cache
+    os.utime(log_copy, ns=(0, os.stat(log_copy).st_mtime_ns + 10**9))
+    assert_same_log(load_log(log_copy, cache_dir), fresh)
+
+
+def test_edit_of_the_same_size_invalidates_the_cache(tmp_path, log_copy):
+    cache_dir = str(tmp_path / "cache")
+    load_log(log_copy, cache_dir)
+
+    with open(log_copy, "rb") as f:
+        data = f.read()
+    edited = data.replace(b"Category A", b"Category C", 1)
+    assert edited != data
+    stat = os.stat(log_copy)
+    with open(log_copy, "wb") as f:
+        f.write(edited)
+    # Only the content hash tells the files apart
+    os.utime(log_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert os.path.getsize(log_copy) == stat.st_size
+
+    reloaded = load_log(log_copy, cache_dir)
+    assert_same_log(reloaded, parse_log(log_copy))
+    assert reloaded.categories != parse_log(INPUT_LOG).categories
+
+
+# Truncated rows, truncated header, wrong magic and empty file
+CORRUPTIONS = [lambda data: data[:-1], lambda data: data[:20], lambda data: b"WHLOG0" + data[6:], lambda data: b""]
+
+
+@pytest.mark.parametrize("corrupt", CORRUPTIONS)
+def test_corrupt_cache_is_parsed_again(tmp_path, log_copy, corrupt):
+    cache_dir = str(tmp_path / "cache")
+    fresh = load_log(log_copy, cache_dir)
+    cache_path = _cache_path(log_copy, cache_dir)
+    with open(cache_path, "rb") as f:
+        data = f.read()
+    with open(cache_path, "wb") as f:
+        f.write(corrupt(data))
+
+    assert_same_log(load_log(log_copy, cache_dir), fresh)
+    # The cache file is rewritten by the parse
+    with open(cache_path, "rb") as f:
+        assert f.read() == data
+
+
+def test_cached_and_streamed_operations_are_equal(tmp_path):
+    in_memory = load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None)
+    assert operation_days(load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=str(tmp_path))) == operation_days(in_memory)
+    assert operation_days(OperationLog(INPUT_LOG, OUTPUT_LOG)) == operation_days(in_memory)
+
+    # Days are in calendar order and a range gives the same days either way
+    ordinals = [ordinal for ordinal, _ in in_memory.iter_days()]
+    assert ordinals == sorted(ordinals)
+    first, last = ordinals[5], ordinals[20]
+    streamed = OperationLog(INPUT_LOG, OUTPUT_LOG).days_between(first, last)
+    assert operation_days(streamed) == operation_days(in_memory.days_between(first, last))
+
+
+@pytest.mark.parametrize("name", ["greedy", "fifo", "optimal"])
+def test_streaming_and_in_memory_runs_give_equal_totals(name):
+    totals = []
+    for streaming in (False, True):
+        warehouse = get_strategy(name)()
+        Simulator([warehouse], input_log=INPUT_LOG, output_log=OUTPUT_LOG, cache_dir=None, streaming=streaming).run_simulation()
+        totals.append((warehouse.input_operation_time, warehouse.output_operation_time))
+    assert totals[0] == totals[1]
+    assert totals[0][0] > 0 and totals[0][1] > 0
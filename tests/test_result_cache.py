@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+
+from app import Simulator
+from src import result_cache
+from src.classes import Category, Europallet
+from src.layout import WarehouseLayout
+from src.result_cache import ResultCache, cacheable, result_key
+from src.snapshot import fork_warehouse
+from src.strategy import get_strategy
+from src.warehouse_greedy import Warehouse_Greedy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+LOG_DIGESTS = {"input": "0" * 64, "output": "1" * 64}
+STRATEGIES = ["greedy", "lifo", "optimal"]
+
+
+def simulator(warehouses, cache: ResultCache) -> Simulator:
+    return Simulator(warehouses, input_log=INPUT_LOG, output_log=OUTPUT_LOG, cache_dir=None, result_cache=cache)
+
+
+def test_cache_hit_equals_fresh_run(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    fresh = simulator([get_strategy(name)() for name in STRATEGIES], cache)
+    fresh.run_simulation()
+    assert len(os.listdir(tmp_path)) == len(STRATEGIES)
+
+    cached = simulator([get_strategy(name)() for name in STRATEGIES], cache)
+    cached.run_simulation()
+    assert cached.results == fresh.results
+    # Cached strategies are not simulated again
+    assert all(warehouse.input_operation_time == 0 for warehouse in cached.warehouses)
+
+
+def test_forked_warehouses_are_cacheable(tmp_path):
+    # Scenario runs leave forked warehouses, with paged slots, in the simulator
+    warehouses = [fork_warehouse(get_strategy(name)()) for name in STRATEGIES]
+    assert all(cacheable(warehouse) for warehouse in warehouses)
+    forked = simulator(warehouses, ResultCache(str(tmp_path)))
+    forked.run_simulation()
+
+    plain = simulator([get_strategy(name)() for name in STRATEGIES], None)
+    plain.run_simulation()
+    assert forked.results == plain.results
+
+
+def test_used_warehouses_are_not_cacheable():
+    warehouse = get_strategy("greedy")()
+    warehouse.input_operation_time = 1.0
+    assert not cacheable(warehouse)
+    # Stored pallets count even with the operation times reset, also in paged slots
+    branch = fork_warehouse(get_strategy("greedy")())
+    branch.place_pallet(Europallet(Category.C))
+    branch.input_operation_time = 0
+    assert not cacheable(branch)
+
+
+def test_key_changes_with_strategy_parameters_and_layout():
+    key = result_key(get_strategy("greedy")(), LOG_DIGESTS, False, True)
+    assert result_key(get_strategy("greedy")(), LOG_DIGESTS, False, True) == key
+    assert result_key(get_strategy("lifo")(), LOG_DIGESTS, False, True) != key
+    assert result_key(get_strategy("greedy")(WarehouseLayout(bays_per_rack=12)), LOG_DIGESTS, False, True) != key
+    assert result_key(get_strategy("greedy")(WarehouseLayout(aisle_spacing=6.0)), LOG_DIGESTS, False, True) != key
+    assert result_key(get_strategy("greedy")(), LOG_DIGESTS, True, True) != key
+    assert result_key(get_strategy("greedy")(), {**LOG_DIGESTS, "input": "2" * 64}, False, True) != key
+
+    optimal = get_strategy("optimal")()
+    optimal_key = result_key(optimal, LOG_DIGESTS, False, True)
+    optimal.output_weight = 2.0
+    assert result_key(optimal, LOG_DIGESTS, False, True) != optimal_key
+
+
+def test_key_changes_with_strategy_source():
+    # A subclass is a different strategy, even when it changes nothing
+    class Warehouse_Greedy_Copy(Warehouse_Greedy):
+        pass
+
+    assert result_key(Warehouse_Greedy_Copy(), LOG_DIGESTS, False, True) != result_key(Warehouse_Greedy(), LOG_DIGESTS, False, True)
+
+
+def test_key_changes_with_simulation_sources(monkeypatch):
+    key = result_key(get_strategy("greedy")(), LOG_DIGESTS, False, True)
+    for module_name in ("src.layout", "src.simulation", "src.warehouse_greedy", "src.strategy"):
+        source_digest = result_cache._source_digest
+
+        def edited_digest(name, edited=module_name, digest=source_digest):
+            return "edited" if name == edited else digest(name)
+
+        monkeypatch.setattr(result_cache, "_source_digest", edited_digest)
+        result_cache.strategy_digest.cache_clear()
+        assert result_key(get_strategy("greedy")(), LOG_DIGESTS, False, True) != key, module_name
+        monkeypatch.undo()
+    result_cache.strategy_digest.cache_clear()
+
+
+def test_every_simulation_module_is_hashed():
+    # Whatever the day loop imports from src can change results, so it has to be part of the key
+    imported = subprocess.run(
+        [sys.executable, "-c", "import sys, src.simulation; print(' '.join(name for name in sys.modules if name.startswith('src.')))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert set(imported) <= set(result_cache._SIMULATION_MODULES)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=200)
+    for number in range(10):
+        cache.put(f"{number:064x}", {"total": number, "padding": "x" * 40})
+    assert cache.get(f"{9:064x}") == {"total": 9, "padding": "x" * 40}
+    assert cache.get(f"{0:064x}") is None
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 200
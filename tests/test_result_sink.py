@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+import app
+from app import Simulator
+from src.result_sink import DAY_COLUMNS, FLEET_COLUMNS, OPERATION_COLUMNS, ResultSink, read_npz
+from src.strategy import get_strategy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+STRATEGIES = ["greedy", "fifo", "optimal"]
+
+
+def test_sink_round_trip(tmp_path):
+    path = str(tmp_path / "results.npz")
+    with ResultSink(path, chunk_rows=100) as sink:
+        warehouses = [get_strategy(name)() for name in STRATEGIES]
+        simulator = Simulator(warehouses, input_log=INPUT_LOG, output_log=OUTPUT_LOG, cache_dir=None, sink=sink)
+        simulator.run_simulation()
+    assert os.listdir(tmp_path) == ["results.npz"]
+
+    columns = read_npz(path)
+    tables = {"operations": OPERATION_COLUMNS, "days": DAY_COLUMNS, "fleet": FLEET_COLUMNS}
+    assert set(columns) == {*(f"{table}_{column}" for table, names in tables.items() for column in names), "strategies"}
+    assert columns["strategies"] == [warehouse.__class__.__name__ for warehouse in simulator.warehouses]
+    assert len(columns["fleet_strategy"]) == 0
+
+    days = len(simulator.operations_by_date)
+    for index, warehouse in enumerate(simulator.warehouses):
+        operations = [row for row, strategy in enumerate(columns["operations_strategy"]) if strategy == index]
+        day_rows = [row for row, strategy in enumerate(columns["days_strategy"]) if strategy == index]
+        assert len(day_rows) == days
+        assert sum(columns["operations_cost"][row] for row in operations if columns["operations_operation"][row] == 0) == pytest.approx(
+            warehouse.input_operation_time
+        )
+        assert sum(columns["days_input_time"][row] for row in day_rows) == pytest.approx(warehouse.input_operation_time)
+        assert sum(columns["days_output_time"][row] for row in day_rows) == pytest.approx(warehouse.output_operation_time)
+        assert sum(columns["days_inputs"][row] + columns["days_outputs"][row] for row in day_rows) == len(operations)
+    assert len({len(columns[f"operations_{column}"]) for column in OPERATION_COLUMNS}) == 1
+
+
+def test_npz_report_includes_the_fleet(tmp_path):
+    path = str(tmp_path / "results.npz")
+    argv = ["--input-log", INPUT_LOG, "--output-log", OUTPUT_LOG, "--no-cache", "--strategies", *STRATEGIES, "--forklifts", "3"]
+    app.main([*argv, "--format", "npz", "--output", path])
+    columns = read_npz(path)
+
+    app.main([*argv, "--format", "json", "--output", str(tmp_path / "results.json")])
+    with open(tmp_path / "results.json") as f:
+        report = json.load(f)
+    assert list(columns["fleet_strategy"]) == [0, 1, 2] and list(columns["fleet_forklifts"]) == [3, 3, 3]
+    for index, name in enumerate(columns["strategies"]):
+        assert columns["fleet_makespan"][index] == report[name]["makespan"]
+        assert columns["fleet_utilization"][index] == report[name]["utilization"]
+        assert columns["fleet_congestion_wait"][index] == report[name]["congestion_wait"]
+
+
+def test_failed_run_leaves_no_files(tmp_path):
+    path = str(tmp_path / "results.npz")
+    with pytest.raises(FileNotFoundError):
+        app.main(["--input-log", str(tmp_path / "missing.csv"), "--output-log", OUTPUT_LOG, "--format", "npz", "--output", path])
+    assert os.listdir(tmp_path) == []
+
+    with pytest.raises(RuntimeError):
+        with ResultSink(path) as sink:
+            writer = sink.writer("Warehouse_Greedy")
+            writer.flush()
+            raise RuntimeError("simulation failed")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,114 @@
+import asyncio
+
+from src.layout import WarehouseLayout
+from src.service import SlottingClient, SlottingService
+from src.strategy import get_strategy
+
+
+def serve(warehouse, scenario, **options):
+    # Runs scenario(client, service) against a service on a free local port
+    async def run():
+        service = SlottingService(warehouse, **options)
+        host, port = await service.start(port=0)
+        client = await SlottingClient.connect(host, port)
+        try:
+            return await scenario(client, service)
+        finally:
+            await client.close()
+            await service.close()
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_place_retrieve_and_stats():
+    warehouse = get_strategy("greedy")()
+
+    async def scenario(client, service):
+        placed = await client.place("A")
+        retrieved = await client.retrieve("Category A")
+        missing = await client.retrieve("B")
+        stats = await client.stats()
+        return placed, retrieved, missing, stats
+
+    placed, retrieved, missing, stats = serve(warehouse, scenario)
+    assert placed["ok"] and retrieved["ok"]
+    assert retrieved["slot"] == placed["slot"] and retrieved["pallet_id"] == placed["pallet_id"]
+    assert placed["cost"] == warehouse.input_operation_time
+    assert retrieved["cost"] == warehouse.output_operation_time
+    assert missing == {"id": 3, "ok": False, "error": "no pallet in stock is of Category B"}
+    assert stats["ok"] and stats["requests"] == 3 and stats["stored_pallets"] == 0
+
+
+def test_pipelined_requests_are_answered_in_order():
+    async def scenario(client, service):
+        return await asyncio.gather(*(client.place("C", pallet_id=100 + number) for number in range(20)))
+
+    replies = serve(get_strategy("lifo")(), scenario)
+    assert [reply["id"] for reply in replies] == list(range(1, 21))
+    assert [reply["pallet_id"] for reply in replies] == list(range(100, 120))
+    assert len({tuple(reply["slot"]) for reply in replies}) == 20
+
+
+def test_duplicate_pallet_id_is_rejected():
+    async def scenario(client, service):
+        first, duplicate = await asyncio.gather(client.place("C", pallet_id=7), client.place("B", pallet_id=7))
+        retrieved = await client.retrieve("C")
+        again = await client.place("B", pallet_id=7)
+        return first, duplicate, retrieved, again
+
+    first, duplicate, retrieved, again = serve(get_strategy("greedy")(), scenario)
+    assert first["ok"] and first["pallet_id"] == 7
+    assert duplicate == {"id": 2, "ok": False, "error": "pallet 7 is already stored"}
+    # Once retrieved, the ID may be stored again
+    assert retrieved["pallet_id"] == 7
+    assert again["ok"] and again["pallet_id"] == 7
+
+
+def test_out_of_range_pallet_id_is_rejected():
+    async def scenario(client, service):
+        replies = [await client.place("A", pallet_id=pallet_id) for pallet_id in (2**62, -1, True, "12")]
+        largest = await client.place("A", pallet_id=2**62 - 1)
+        return replies, largest, await client.place("A")
+
+    replies, largest, generated = serve(get_strategy("greedy")(), scenario)
+    assert all(not reply["ok"] and reply["error"].startswith("pallet_id must be an integer") for reply in replies)
+    assert largest["ok"] and largest["pallet_id"] == 2**62 - 1
+    # Generated IDs go on above the largest client ID without overflowing the state
+    assert generated["ok"] and generated["pallet_id"] == 2**62
+
+
+def test_failing_batch_is_answered_and_the_service_goes_on():
+    warehouse = get_strategy("greedy")()
+    place_batch = warehouse.place_batch
+
+    def failing_place_batch(pallets, optimize=False):
+        if len(pallets) > 1:
+            raise OverflowError("simulated failure")
+        return place_batch(pallets, optimize)
+
+    warehouse.place_batch = failing_place_batch
+
+    async def scenario(client, service):
+        # Pipelined placements are decided as one group, which fails as a whole
+        failed = await asyncio.gather(*(client.place("C", pallet_id=number) for number in range(5)))
+        return failed, await client.place("C", pallet_id=0), await client.stats()
+
+    failed, retried, stats = serve(warehouse, scenario, batch_window=0.05)
+    error = "OverflowError: simulated failure"
+    assert all(reply == {"id": number + 1, "ok": False, "error": error} for number, reply in enumerate(failed))
+    # The IDs of the failed group are released, and the worker still answers
+    assert retried["ok"] and retried["pallet_id"] == 0
+    assert stats["stored_pallets"] == 1
+
+
+def test_full_warehouse_answers_every_queued_request():
+    # A warehouse of two slots gets more placements than it holds, all queued at once
+    warehouse = get_strategy("greedy")(WarehouseLayout(racks=1, bays_per_rack=1, shelves_per_bay=1, pallets_per_shelf=2))
+
+    async def scenario(client, service):
+        return await asyncio.gather(*(client.place("C") for _ in range(50))), await client.stats()
+
+    replies, stats = serve(warehouse, scenario)
+    assert [reply["ok"] for reply in replies] == [True, True] + [False] * 48
+    assert all(reply["error"] == "no free slot accepts Category C" for reply in replies[2:])
+    assert stats["requests"] == 50 and stats["stored_pallets"] == 2
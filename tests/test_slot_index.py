@@ -0,0 +1,202 @@
+import os
+import random
+
+import pytest
+
+from src.classes import Category, Europallet
+from src.constants import (
+    BAYS_PER_RACK,
+    DISTANCE_TO_AREAS,
+    FORKLIFT_SPEED,
+    LIFT_SPEED,
+    PALLET_WIDTH,
+    PALLETS_PER_SHELF,
+    RACK_WIDTH,
+    SHELF_HEIGHT,
+    SHELVES_PER_BAY,
+)
+from src.operations import load_operations
+from src.strategy import get_strategy
+
+# The slot indexes must pick exactly the slots the original strategies found by scanning every shelf.
+# ScanWarehouse keeps that scan logic on a plain grid as the reference.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_inputs.csv")
+OUTPUT_LOG = os.path.join(ROOT, "static", "warehouse_log_outputs.csv")
+RACKS = 2
+STRATEGIES = ["greedy", "fill_ends", "fill_middle", "lifo", "fifo"]
+
+
+def scan_operation_time(bay_position: int, shelf_level: int, pallet_position: int, is_output: bool) -> float:
+    if is_output:
+        bay_distance = (BAYS_PER_RACK - bay_position - 1) * RACK_WIDTH
+        rack_distance = (PALLETS_PER_SHELF - pallet_position - 1) * PALLET_WIDTH
+    else:
+        bay_distance = bay_position * RACK_WIDTH
+        rack_distance = pallet_position * PALLET_WIDTH
+
+    one_way_distance = DISTANCE_TO_AREAS + bay_distance + rack_distance + (PALLET_WIDTH / 2)
+    horizontal_time = 2 * one_way_distance / FORKLIFT_SPEED
+    vertical_time = (shelf_level * SHELF_HEIGHT * 2) / LIFT_SPEED
+    return horizontal_time + vertical_time
+
+
+def accepts(shelf_num: int, category: Category) -> bool:
+    if category == Category.A:
+        return shelf_num == 0
+    if category == Category.B:
+        return shelf_num == SHELVES_PER_BAY - 1
+    return True
+
+
+class ScanWarehouse:
+    def __init__(self, strategy: str):
+        self.strategy = strategy
+        self.grid = {
+            (rack_num, bay_num, shelf_num): [None] * PALLETS_PER_SHELF
+            for rack_num in range(RACKS)
+            for bay_num in range(BAYS_PER_RACK)
+            for shelf_num in range(SHELVES_PER_BAY)
+        }
+        self.input_operation_time = 0
+        self.output_operation_time = 0
+
+    def positions(self):
+        return [
+            (rack_num, bay_num, shelf_num)
+            for bay_num in range(BAYS_PER_RACK)
+            for rack_num in range(RACKS)
+            for shelf_num in range(SHELVES_PER_BAY)
+        ]
+
+    def positions_from_middle(self):
+        mid_bay = BAYS_PER_RACK // 2
+        for offset in range(mid_bay + 1):
+            for bay_num in (mid_bay + offset, mid_bay - offset):
+                if 0 <= bay_num < BAYS_PER_RACK:
+                    for rack_num in range(RACKS):
+                        for shelf_num in range(SHELVES_PER_BAY):
+                            yield rack_num, bay_num, shelf_num
+
+    def find_free_slot(self, category: Category):
+        free = [
+            (position, self.grid[position].index(None))
+            for position in self.positions()
+            if accepts(position[2], category) and None in self.grid[position]
+        ]
+        if self.strategy == "lifo":
+            free = free[:1]
+        elif self.strategy == "fifo":
+            free = free[-1:]
+        elif self.strategy == "fill_middle":
+            free = [
+                (position, self.grid[position].index(None))
+                for position in self.positions_from_middle()
+                if accepts(position[2], category) and None in self.grid[position]
+            ][:1]
+
+        best_time, best_slot = float("inf"), None
+        for (rack_num, bay_num, shelf_num), pallet_pos in free:
+            operation_time = scan_operation_time(bay_num, shelf_num, pallet_pos, False)
+            if self.strategy == "fill_ends":
+                operation_time = min(operation_time, scan_operation_time(bay_num, shelf_num, pallet_pos, True))
+            if operation_time < best_time:
+                best_time, best_slot = operation_time, (rack_num, bay_num, shelf_num, pallet_pos)
+        return best_slot
+
+    def find_stored_pallet(self, category: Category):
+        if self.strategy in ("lifo", "fifo"):
+            for position in reversed(self.positions()):
+                pallets = self.grid[position]
+                if category in pallets:
+                    if self.strategy == "lifo":
+                        pallet_pos = pallets.index(category)
+                    else:
+                        pallet_pos = len(pallets) - 1 - pallets[::-1].index(category)
+                    return (*position, pallet_pos)
+            return None
+
+        best_time, best_slot = float("inf"), None
+        for rack_num, bay_num, shelf_num in self.positions():
+            for pallet_pos, stored in enumerate(self.grid[(rack_num, bay_num, shelf_num)]):
+                if stored == category:
+                    operation_time = scan_operation_time(bay_num, shelf_num, pallet_pos, True)
+                    if operation_time < best_time:
+                        best_time, best_slot = operation_time, (rack_num, bay_num, shelf_num, pallet_pos)
+        return best_slot
+
+    def place_pallet(self, pallet: Europallet):
+        slot = self.find_free_slot(pallet.category)
+        if slot is not None:
+            self.grid[slot[:3]][slot[3]] = pallet.category
+            self.input_operation_time += scan_operation_time(slot[1], slot[2], slot[3], False)
+        return slot
+
+    def retrieve_pallet(self, pallet_request: Europallet):
+        slot = self.find_stored_pallet(pallet_request.category)
+        if slot is not None:
+            self.grid[slot[:3]][slot[3]] = None
+            self.output_operation_time += scan_operation_time(slot[1], slot[2], slot[3], True)
+        return slot
+
+
+def replay(strategy: str, operations):
+    # Runs the indexed strategy and the reference side by side, operation by operation
+    warehouse = get_strategy(strategy)()
+    reference = ScanWarehouse(strategy)
+    for step, (input_output, pallet) in enumerate(operations):
+        if input_output == "input":
+            expected = reference.place_pallet(pallet)
+            slot = warehouse.find_free_slot(pallet)
+            assert warehouse.place_pallet(pallet) == (expected is not None)
+        else:
+            expected = reference.retrieve_pallet(pallet)
+            slot = warehouse.find_stored_pallet(pallet)
+            assert warehouse.retrieve_pallet(pallet) == (expected is not None)
+        assert slot == expected, f"{strategy}: step {step} ({input_output} {pallet.category.name})"
+        assert warehouse.input_operation_time == reference.input_operation_time
+        assert warehouse.output_operation_time == reference.output_operation_time
+    return warehouse
+
+
+def log_operations():
+    operations_by_date = load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None)
+    return [
+        (input_output, pallet)
+        for _, day in operations_by_date.items()
+        for input_output in ("input", "output")
+        for pallet in day[input_output]
+    ]
+
+
+def random_operations(seed: int, count: int = 3000):
+    # Heavy on inputs at first so that the warehouse fills up and placements start to fail
+    rng = random.Random(seed)
+    operations = []
+    for step in range(count):
+        input_share = 0.8 if step < count // 3 else 0.45
+        operations.append(("input" if rng.random() < input_share else "output", Europallet(rng.choice(list(Category)))))
+    return operations
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_indexes_match_scan_on_bundled_logs(strategy):
+    replay(strategy, log_operations())
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+@pytest.mark.parametrize("seed", [1, 2])
+def test_indexes_match_scan_on_random_workload(strategy, seed):
+    replay(strategy, random_operations(seed))
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_batches_match_scan_totals(strategy):
+    # place_batch/retrieve_batch, used by the simulator, give the same totals as the reference
+    warehouse = get_strategy(strategy)()
+    reference = ScanWarehouse(strategy)
+    for _, day in load_operations(INPUT_LOG, OUTPUT_LOG, cache_dir=None).items():
+        assert warehouse.place_batch(day["input"]) == [reference.place_pallet(pallet) is not None for pallet in day["input"]]
+        assert warehouse.retrieve_batch(day["output"]) == [reference.retrieve_pallet(pallet) is not None for pallet in day["output"]]
+    assert warehouse.input_operation_time == reference.input_operation_time
+    assert warehouse.output_operation_time == reference.output_operation_time
@@ -0,0 +1,154 @@
+import random
+import struct
+from array import array
+from dataclasses import astuple
+from itertools import count
+
+import pytest
+
+from src.classes import CATEGORY_CODES, Category, Europallet
+from src.layout import DEFAULT_LAYOUT, WarehouseLayout
+from src.snapshot import load_inventory, read_snapshot, restore_snapshot, take_snapshot, write_snapshot
+from src.strategy import get_strategy
+
+CUSTOM_LAYOUT = WarehouseLayout(racks=5, bays_per_rack=7, shelves_per_bay=3, pallets_per_shelf=4, racks_per_aisle=2, aisle_spacing=6.5)
+# Headers of the formats before WHSNP3, which did not record the aisles of the layout
+LEGACY_HEADER = struct.Struct("<6s4I6d2dqI")
+
+
+def used_warehouse(layout: WarehouseLayout, name: str = "fifo_age"):
+    # Pallet IDs grow with arrival like generated ones, which a restored FIFO_Age relies on to order same-day pallets
+    rng = random.Random(3)
+    pallet_ids = count(2**40)
+    warehouse = get_strategy(name)(layout)
+    for day in range(738000, 738030):
+        warehouse.place_batch([Europallet(rng.choice(list(Category)), day, next(pallet_ids)) for _ in range(rng.randint(0, 20))])
+        warehouse.retrieve_batch([Europallet(rng.choice(list(Category)), day) for _ in range(rng.randint(0, 15))])
+    return warehouse
+
+
+def assert_same_snapshot(snapshot, other):
+    assert snapshot.layout == other.layout
+    assert snapshot.slots == other.slots
+    assert (snapshot.input_operation_time, snapshot.output_operation_time, snapshot.day) == (
+        other.input_operation_time,
+        other.output_operation_time,
+        other.day,
+    )
+    assert snapshot.pallet_ids == other.pallet_ids and snapshot.arrival_days == other.arrival_days
+    assert snapshot.dwell_times.summary() == other.dwell_times.summary()
+
+
+def write_legacy(path, snapshot, magic: bytes):
+    # Writes the snapshot as WHSNP1 (category codes only) or WHSNP2 (codes, pallet columns and dwell counters)
+    layout = astuple(snapshot.layout)[:10]
+    operation_times = (snapshot.input_operation_time, snapshot.output_operation_time)
+    header = LEGACY_HEADER.pack(magic, *layout, *operation_times, snapshot.day, len(snapshot.slots))
+    data = header + snapshot.slots
+    if magic == b"WHSNP2":
+        dwell_times = snapshot.dwell_times
+        dwell_counters = array("q", dwell_times.counts + dwell_times.totals + dwell_times.longest)
+        data += struct.pack(f"<{len(snapshot.slots)}q", *snapshot.pallet_ids)
+        data += struct.pack(f"<{len(snapshot.slots)}i", *snapshot.arrival_days)
+        data += struct.pack(f"<{len(dwell_counters)}q", *dwell_counters)
+    path.write_bytes(data)
+
+
+@pytest.mark.parametrize("layout", [DEFAULT_LAYOUT, CUSTOM_LAYOUT])
+def test_snapshot_round_trip(tmp_path, layout):
+    warehouse = used_warehouse(layout)
+    snapshot = take_snapshot(warehouse, day=738029)
+    write_snapshot(snapshot, str(tmp_path / "state.bin"))
+    assert (tmp_path / "state.bin").read_bytes()[:6] == b"WHSNP3"
+    read = read_snapshot(str(tmp_path / "state.bin"))
+    assert_same_snapshot(read, snapshot)
+
+    # A restored warehouse goes on exactly like the original
+    restored = restore_snapshot(get_strategy("fifo_age")(layout), read)
+    for other in (warehouse, restored):
+        other.place_batch([Europallet(Category.C, 738030, 2**41 + number) for number in range(10)])
+        other.retrieve_batch([Europallet(category, 738031) for category in Category])
+    assert_same_snapshot(take_snapshot(restored), take_snapshot(warehouse))
+
+
+def test_snapshot_without_day_or_pallet_columns(tmp_path):
+    snapshot = take_snapshot(used_warehouse(DEFAULT_LAYOUT))
+    snapshot.pallet_ids = snapshot.arrival_days = snapshot.dwell_times = None
+    write_snapshot(snapshot, str(tmp_path / "state.bin"))
+    read = read_snapshot(str(tmp_path / "state.bin"))
+    assert read.day is None and read.slots == snapshot.slots
+    assert set(read.pallet_ids) == {-1} and set(read.arrival_days) == {-1}
+    assert sum(read.dwell_times.counts) == 0
+
+
+@pytest.mark.parametrize("magic", [b"WHSNP1", b"WHSNP2"])
+def test_legacy_snapshots(tmp_path, magic):
+    # Legacy files predate aisles: all their racks faced the same aisle
+    layout = WarehouseLayout(racks=2, bays_per_rack=6)
+    snapshot = take_snapshot(used_warehouse(layout), day=738029)
+    write_legacy(tmp_path / "state.bin", snapshot, magic)
+    read = read_snapshot(str(tmp_path / "state.bin"))
+
+    assert read.layout == layout and read.layout.aisles == 1
+    assert read.slots == snapshot.slots
+    assert (read.input_operation_time, read.output_operation_time) == (snapshot.input_operation_time, snapshot.output_operation_time)
+    assert read.day == 738029
+    if magic == b"WHSNP1":
+        assert read.pallet_ids is None and read.arrival_days is None and read.dwell_times is None
+    else:
+        assert_same_snapshot(read, snapshot)
+
+
+def test_legacy_snapshots_keep_their_racks_in_one_aisle(tmp_path):
+    layout = WarehouseLayout(racks=4, racks_per_aisle=4)
+    snapshot = take_snapshot(used_warehouse(layout))
+    # Day 0 is how every format records an unknown day
+    snapshot.day = 0
+    write_legacy(tmp_path / "state.bin", snapshot, b"WHSNP2")
+    read = read_snapshot(str(tmp_path / "state.bin"))
+    assert read.layout == layout and read.day is None
+    restored = restore_snapshot(get_strategy("greedy")(layout), read)
+    assert restored.input_operation_time == snapshot.input_operation_time
+
+
+def test_invalid_snapshots_are_rejected(tmp_path):
+    path = tmp_path / "state.bin"
+    write_snapshot(take_snapshot(used_warehouse(DEFAULT_LAYOUT)), str(path))
+    data = path.read_bytes()
+
+    for broken, message in (
+        (data[:-1], "truncated"),
+        (data + b"\0", "truncated"),
+        (data[:40], "not a warehouse snapshot"),
+        (b"WHSNP9" + data[6:], "not a warehouse snapshot"),
+        (b"", "not a warehouse snapshot"),
+    ):
+        path.write_bytes(broken)
+        with pytest.raises(ValueError, match=message):
+            read_snapshot(str(path))
+
+    snapshot = take_snapshot(used_warehouse(DEFAULT_LAYOUT))
+    with pytest.raises(ValueError, match="different layout"):
+        restore_snapshot(get_strategy("greedy")(CUSTOM_LAYOUT), snapshot)
+
+
+def test_inventory(tmp_path):
+    path = tmp_path / "inventory.csv"
+    path.write_text("Rack,Bay,Shelf,Category,Position\n0,2,0,Category A,\n0,2,0,Category A,2\n1,9,3,Category B,\n0,2,0,Category C,\n")
+    snapshot = load_inventory(str(path), day=738000)
+
+    offset = DEFAULT_LAYOUT.shelf_offset(0, 2, 0)
+    a, b, c = (CATEGORY_CODES[category] for category in Category)
+    assert snapshot.slots[offset : offset + 3] == bytes([a, c, a])
+    assert snapshot.slots[DEFAULT_LAYOUT.shelf_offset(1, 9, 3)] == b
+    assert snapshot.day == 738000 and len(snapshot.slots) - snapshot.slots.count(0) == 4
+
+    for rows, message in (
+        ("2,0,0,Category C,\n", "outside the layout"),
+        ("0,0,1,Category A,\n", "not allowed"),
+        ("0,0,0,Category A,1\n0,0,0,Category A,1\n", "not a free slot"),
+        ("0,0,0,Category A,\n" * 4, "already full"),
+    ):
+        path.write_text("Rack,Bay,Shelf,Category,Position\n" + rows)
+        with pytest.raises(ValueError, match=message):
+            load_inventory(str(path))
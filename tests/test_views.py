@@ -0,0 +1,76 @@
+import pytest
+
+from src.classes import Bay, Category, Europallet, Rack, Shelf
+from src.layout import DEFAULT_LAYOUT
+from src.strategy import get_strategy
+
+
+def stored_pallets(warehouse):
+    return [
+        ((rack.rack_number, bay.position, shelf.level, pallet_pos), pallet)
+        for rack in warehouse.racks
+        for bay in rack.bays
+        for shelf in bay.shelves
+        for pallet_pos, pallet in enumerate(shelf.pallets)
+        if pallet is not None
+    ]
+
+
+def test_views_slice_like_lists():
+    warehouse = get_strategy("greedy")()
+    bays = warehouse.racks[0].bays[1:3]
+    assert [bay.position for bay in bays] == [1, 2]
+    assert [bay.position for bay in warehouse.racks[1].bays[::-3]] == [9, 6, 3, 0]
+    assert [shelf.level for shelf in warehouse.racks[0].bays[-1].shelves[1:]] == [1, 2, 3]
+    assert warehouse.racks[0].bays[2:2] == []
+    assert warehouse.racks[0].bays[-1].position == DEFAULT_LAYOUT.bays_per_rack - 1
+    with pytest.raises(IndexError):
+        warehouse.racks[0].bays[DEFAULT_LAYOUT.bays_per_rack]
+    assert warehouse.racks[0].bays[0].shelves[0].pallets[1:] == [None, None]
+
+
+def test_warehouse_views_are_read_only():
+    warehouse = get_strategy("greedy")()
+    warehouse.place_pallet(Europallet(Category.A))
+    rack = warehouse.racks[0]
+    shelf = rack.bays[0].shelves[0]
+
+    with pytest.raises(TypeError, match="read-only"):
+        shelf.add_pallet(Europallet(Category.A))
+    with pytest.raises(TypeError, match="read-only"):
+        shelf.pallets[1] = Europallet(Category.A)
+    with pytest.raises(TypeError, match="read-only"):
+        rack.bays[3].shelves[0].pallets[:] = [None] * DEFAULT_LAYOUT.pallets_per_shelf
+    with pytest.raises(TypeError, match="read-only"):
+        warehouse.racks[1].bays[1:3][0].shelves[2].pallets[0] = None
+    assert [pallet.category for _, pallet in stored_pallets(warehouse)] == [Category.A]
+
+
+def test_standalone_views_stay_writable():
+    shelf = Shelf(0)
+    assert shelf.add_pallet(Europallet(Category.A))
+    shelf.pallets[1:] = [Europallet(Category.C), None]
+    assert [pallet and pallet.category for pallet in shelf.pallets] == [Category.A, Category.C, None]
+    with pytest.raises(ValueError):
+        shelf.pallets[:] = [None]
+
+    assert Bay(0).shelves[3].add_pallet(Europallet(Category.B))
+    assert len(Rack(0).bays[2:5]) == 3
+
+
+def test_views_decode_stored_pallets():
+    warehouse = get_strategy("greedy")()
+    pallets = [Europallet(Category.A, 738000, 41), Europallet(Category.B, 738001, 42), Europallet(Category.C, 738002, 2**40)]
+    slots = []
+    for pallet in pallets:
+        slots.append(warehouse.find_free_slot(pallet))
+        assert warehouse.place_pallet(pallet)
+
+    decoded = dict(stored_pallets(warehouse))
+    assert sorted(decoded) == sorted(slots)
+    for slot, pallet in zip(slots, pallets):
+        stored = decoded[slot]
+        assert (stored.category, stored.arrival, stored.pallet_id) == (pallet.category, pallet.arrival, pallet.pallet_id)
+        rack_num, bay_num, shelf_num, pallet_pos = slot
+        view = warehouse.racks[rack_num].bays[bay_num].shelves[shelf_num].pallets
+        assert view.index(pallet) == pallet_pos and pallet in view